@@ -4,111 +4,263 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import datetime
 import plotly.express as px
-import io
-import numpy as np
-import re
+import os
+from local_cache import LedgerCache
+from write_queue import WriteQueue
+from scheduler import ScheduledHTTPClient
+from storage import COLUMNS, HEADERS, CATEGORIES, budget_dict, empty_frame, SheetsBackend, ExcelBackend, SQLiteBackend
+from rollups import Rollups
+from ledger import Ledger
+from users import UserDirectory
+import reports
+import trends
+import importer
+import perf
+import threading
+import time
 
 # --- AI LIBRARY SETUP ---
-try:
-    import easyocr
-    import cv2
-    ocr_reader = easyocr.Reader(['en'], gpu=False) 
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+# The OCR model is loaded lazily (see ocr.py), not on every cold start
+import ocr
+from ocr import OCR_AVAILABLE
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="Budget Tracker", page_icon="💰", layout="wide")
 
+def get_setting(key, default=None):
+    # Environment wins over .streamlit/secrets.toml; missing secrets file is fine (offline mode)
+    if f"BUDGET_{key.upper()}" in os.environ: return os.environ[f"BUDGET_{key.upper()}"]
+    try: return st.secrets.get(key, default)
+    except FileNotFoundError: return default
+
+# "sheets" (default), "excel" or "sqlite". The local ones need no Google credentials.
+STORAGE_BACKEND = get_setting("storage_backend", "sheets")
+
+# Timings + Sheets call counts per rerun (see perf.py); off unless perf = true
+perf.configure(get_setting("perf", False))
+
 # --- CONNECT TO GOOGLE SHEETS (API) ---
+# One authorized client per process, shared by every session. Access tokens
+# live for an hour, so the client is rebuilt a little before that.
+CLIENT_TTL = 50 * 60
+SHEET_TTL = 10 * 60
+MAX_OPEN_SHEETS = 200
+
+@perf.timed("get_client")
+@st.cache_resource(ttl=CLIENT_TTL, show_spinner=False)
 def get_client():
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds_dict = dict(st.secrets["gcp_service_account"])
     creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    return gspread.authorize(creds)
+    # Every request goes through the account's rate limiter / retry / de-dupe (scheduler.py)
+    return gspread.authorize(creds, http_client=ScheduledHTTPClient)
+
+# Opening by name is a Drive search, so keep the handles around (LRU + TTL).
+# Failed opens raise and are never cached, so pending accounts are re-checked.
+@st.cache_resource(ttl=SHEET_TTL, max_entries=MAX_OPEN_SHEETS, show_spinner=False)
+def open_sheet(sheet_name):
+    return get_client().open(sheet_name)
+
+@st.cache_resource(ttl=SHEET_TTL, max_entries=MAX_OPEN_SHEETS * 4, show_spinner=False)
+def open_worksheet(sheet_name, tab_name):
+    return open_sheet(sheet_name).worksheet(tab_name)
 
 # --- GOOGLE SHEET FUNCTIONS ---
+@perf.timed("get_sh")
 def get_sh():
-    client = get_client()
-    return client.open(st.session_state['user_sheet_name'])
+    return open_sheet(st.session_state['user_sheet_name'])
+
+@st.cache_resource(show_spinner=False)
+def get_cache(sheet_name):
+    return LedgerCache(sheet_name)
+
+def open_or_create_ws(sheet_name, tab_name):
+    try: return open_worksheet(sheet_name, tab_name)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = open_sheet(sheet_name).add_worksheet(title=tab_name, rows="1000", cols="10")
+        ws.append_row(HEADERS[tab_name])
+        return ws
+
+# Writes go to the local cache immediately and reach Sheets in the background
+@st.cache_resource(show_spinner=False)
+def get_write_queue():
+    return WriteQueue(open_or_create_ws, width=lambda tab: len(COLUMNS[tab]),
+                      on_error=lambda sheet_name, tab: get_cache(sheet_name).invalidate(tab))
+
+# --- STORAGE ---
+@st.cache_resource(show_spinner=False)
+def open_backend(kind, sheet_name):
+    if kind == "sqlite": return SQLiteBackend(get_setting("sqlite_path", "my_budget_data.db"))
+    if kind == "excel": return ExcelBackend(get_setting("excel_path", "my_budget_data.xlsx"))
+    return SheetsBackend(sheet_name, get_cache(sheet_name), get_write_queue(), open_worksheet, open_or_create_ws)
+
+def get_backend():
+    return open_backend(STORAGE_BACKEND, st.session_state['user_sheet_name'])
+
+def data_version():
+    return (st.session_state['user_sheet_name'], *get_backend().versions())
+
+# --- LEDGERS ---
+# Compact, date-sorted copies of both tabs (see ledger.py), shared by every
+# session on that sheet. Only the latest data version is kept: a newer one
+# replaces it. Treat them as read-only.
+@st.cache_resource(show_spinner=False)
+def ledger_slot(kind, sheet_name):
+    return {"version": None, "ledgers": None, "lock": threading.Lock()}
+
+@perf.timed("load_data.ledgers")
+def get_ledgers(kind, version):
+    slot = ledger_slot(kind, version[0])
+    with slot["lock"]:
+        if slot["version"] != version:
+            backend = open_backend(kind, version[0])
+            ledgers = []
+            for tab in ("Expenses", "Income"):
+                try: df = backend.load(tab)
+                except gspread.exceptions.WorksheetNotFound: df = empty_frame(tab)
+                ledgers.append(Ledger.from_frame(tab, df))
+            slot["version"], slot["ledgers"] = version, tuple(ledgers)
+        return slot["ledgers"]
+
+# --- ROLLUPS ---
+# Per-period totals for Analytics. Rebuilt only when the data changed behind
+# our back (sync, other session); our own writes patch them in place.
+@perf.timed("rollups")
+def get_rollups(led_e, led_i):
+    r = st.session_state.get('rollups')
+    if r is None or r.versions != data_version():
+        r = Rollups.build(led_e, led_i)
+        r.versions = data_version()
+        st.session_state['rollups'] = r
+    return r
+
+def track_write(tab_name, write, new_rows=()):
+    r = st.session_state.get('rollups')
+    in_step = r is not None and r.versions == data_version()
+    old_row = write()
+    if in_step:
+        if old_row: r.remove(tab_name, old_row)
+        for row in new_rows: r.add(tab_name, row)
+        r.versions = data_version()
+
+def save_rows(tab_name, rows):
+    track_write(tab_name, lambda: get_backend().append(tab_name, rows), new_rows=rows)
 
 def save_row(tab_name, data):
-    sh = get_sh()
-    try: ws = sh.worksheet(tab_name)
-    except:
-        ws = sh.add_worksheet(title=tab_name, rows="1000", cols="10")
-        head = ["Date", "Description", "Category", "Amount"] if tab_name == "Expenses" else ["Date", "Source", "Amount"]
-        ws.append_row(head)
-    ws.append_row(data)
+    save_rows(tab_name, [data])
 
 def update_row(tab_name, row_idx, data):
-    sh = get_sh()
-    ws = sh.worksheet(tab_name)
-    # Google Sheets is 1-indexed. Header is row 1. Data starts at row 2.
-    # dataframe index 0 = sheet row 2.
-    sheet_row = row_idx + 2
-    
-    # Update cells (Col A, B, C, D...)
-    # We update the whole row range to be efficient
-    cell_range = f"A{sheet_row}:D{sheet_row}" if tab_name == "Expenses" else f"A{sheet_row}:C{sheet_row}"
-    ws.update(range_name=cell_range, values=[data])
+    track_write(tab_name, lambda: get_backend().update(tab_name, row_idx, data), new_rows=[data])
 
 def delete_row(tab_name, idx):
-    sh = get_sh()
-    sh.worksheet(tab_name).delete_rows(idx + 2)
+    track_write(tab_name, lambda: get_backend().delete(tab_name, idx))
+
+# --- BUDGET PLAN ---
+# Limits are read once per session. Spend per category comes from the rollups,
+# which every save / edit / delete already keeps current.
+BUDGET_WARN = 0.9
+
+def get_budget():
+    if st.session_state.get('budget') is None:
+        try: st.session_state['budget'] = get_backend().load_budget()
+        except Exception: return {}
+    return st.session_state['budget']
+
+def budget_usage(rollups, period, months=1):
+    """Budget vs spend for every category with a limit, in one period."""
+    spent = rollups.breakdown("Expenses", period)
+    rows = [(cat, limit * months, float(spent.get(cat, 0.0))) for cat, limit in get_budget().items()]
+    df = pd.DataFrame(rows, columns=["Category", "Budget", "Spent"])
+    df["Used"] = df["Spent"] / df["Budget"]
+    return df
+
+def budget_icon(used):
+    return "🚨" if used > 1 else "⚠️" if used >= BUDGET_WARN else "✅"
+
+# --- REPORTS ---
+# Keyed on the version, so any write makes the next click rebuild; _args aren't hashed
+REPORT_CACHE_SIZE = 32
+
+@perf.timed("export")
+@st.cache_data(max_entries=REPORT_CACHE_SIZE, show_spinner=False)
+def build_report(fmt, period, version, _f_e, _f_i, _rollups):
+    if fmt == "csv": return reports.build_csv(_f_e, _f_i)
+    return reports.build_xlsx(_f_e, _f_i, _rollups, period)
+
+# --- TRENDS ---
+@perf.timed("trends")
+@st.cache_data(max_entries=REPORT_CACHE_SIZE, show_spinner=False)
+def get_trends(version, _led_e, _led_i):
+    return trends.compute(_led_e, _led_i)
 
 # --- USER MANAGEMENT ---
+# Login is a dict lookup in a cached index of Budget_App_Users (see users.py)
+@st.cache_resource(show_spinner=False)
+def get_user_directory():
+    return UserDirectory(lambda: open_sheet("Budget_App_Users").sheet1)
+
 def check_login(username, password):
-    client = get_client()
     try:
-        user_sheet = client.open("Budget_App_Users").sheet1
-        records = user_sheet.get_all_records()
-        df_users = pd.DataFrame(records)
-        user_row = df_users[df_users['Username'].astype(str) == str(username)]
-        if not user_row.empty:
-            stored_password = str(user_row.iloc[0]['Password'])
-            if str(password) == stored_password:
-                return str(user_row.iloc[0]['Sheet_Name'])
+        return get_user_directory().check(username, password)
     except Exception as e:
         st.error(f"Login Error: {e}")
     return None
 
 def register_user_request(username, password, preferred_sheet_name):
-    client = get_client()
     try:
-        master_sheet = client.open("Budget_App_Users").sheet1
-        master_sheet.append_row([username, password, preferred_sheet_name]) 
+        get_user_directory().register(username, password, preferred_sheet_name)
         return True, f"Request sent! Wait for Admin to create '{preferred_sheet_name}'."
     except Exception as e:
         return False, f"Database Error: {e}"
 
+# Per-user state that would otherwise carry over to the next login in this browser
+USER_STATE = ['budget', 'budget_check', 'ocr_job', 'rollups']
+
+def logout():
+    st.session_state['user_sheet_name'] = None
+    for key in USER_STATE: st.session_state.pop(key, None)
+
 def change_user_password(username, new_password):
-    client = get_client()
     try:
-        user_sheet = client.open("Budget_App_Users").sheet1
-        cell = user_sheet.find(username)
-        user_sheet.update_cell(cell.row, 2, new_password)
+        get_user_directory().change_password(username, new_password)
         return True
     except:
         return False
 
 # --- AI SCANNER ---
+# Scans run in worker processes; the page polls the job instead of blocking on it
+@st.cache_resource(show_spinner=False)
+def get_ocr_service():
+    # [ocr_preprocess] in secrets.toml overrides ocr.PREPROCESS (e.g. max_side = 1200)
+    return ocr.OCRService(options=dict(get_setting("ocr_preprocess", {})))
+
 def scan_receipt_for_total(uploaded_file):
-    if not OCR_AVAILABLE or uploaded_file is None: return 0.00
+    """Start scanning the upload (or reuse a cached / running scan of the same image)."""
+    if not OCR_AVAILABLE or uploaded_file is None: return None
+    with perf.timer("ocr_submit"):
+        job = get_ocr_service().submit(uploaded_file.getvalue())
+    if perf.enabled:
+        # Finishes in the background, so it's logged on its own rather than in a rerun
+        started = time.perf_counter()
+        job.add_done_callback(lambda f: perf.record("ocr", (time.perf_counter() - started) * 1000))
+    return job
+
+def apply_scan_result(job):
     try:
-        file_bytes = np.asarray(bytearray(uploaded_file.read()), dtype=np.uint8)
-        img = cv2.imdecode(file_bytes, cv2.IMREAD_GRAYSCALE)
-        result_text = ocr_reader.readtext(img, detail=0)
-        full_text = " ".join(result_text)
-        matches = re.findall(r"(\d{1,3}(?:,\d{3})*(?:\.\d{2}))", full_text)
-        max_price = 0.0
-        for match in matches:
-            clean_price = float(match.replace(',', ''))
-            if clean_price > max_price: max_price = clean_price
-        return max_price
+        val = job.result()
     except Exception as e:
         st.error(f"AI Error: {e}")
-        return 0.00
+        return
+    if val > 0:
+        st.session_state['exp_amount'] = val
+        st.toast(f"Detected: RM{val}", icon="🤖")
+    else:
+        st.toast("No clear price found.", icon="⚠️")
+
+@st.fragment(run_every=1)
+def wait_for_scan():
+    st.caption("🔎 Scanning receipt...")
+    if st.session_state['ocr_job'].done(): st.rerun()
 
 # --- CALLBACKS ---
 def save_income_callback():
@@ -127,9 +279,11 @@ def save_expense_callback():
     a = st.session_state["exp_amount"]
     save_row('Expenses', [d, desc, c, a])
     st.session_state['success_msg'] = "✅ Expense Saved!"
+    st.session_state['budget_check'] = (d[:7], c)
     st.session_state["exp_desc"] = ""
     st.session_state["exp_amount"] = 0.00
     if 'last_file' in st.session_state: del st.session_state['last_file']
+    st.session_state.pop('ocr_job', None)
 
 def delete_callback(tab_name, idx):
     delete_row(tab_name, idx)
@@ -138,7 +292,7 @@ def delete_callback(tab_name, idx):
 # --- EDIT DIALOG FUNCTION ---
 @st.dialog("Edit Transaction")
 def edit_transaction_dialog(tab_name, idx, row_data):
-    st.write(f"Editing {tab_name} (Row {idx+1})")
+    st.write(f"Editing {tab_name} ({row_data['Date'].strftime('%Y-%m-%d')}, RM{row_data['Amount']})")
     
     # Pre-fill data
     current_date = pd.to_datetime(row_data['Date']).date()
@@ -146,11 +300,10 @@ def edit_transaction_dialog(tab_name, idx, row_data):
     
     if tab_name == "Expenses":
         current_cat = row_data['Category']
-        cats = ["Food", "Transport", "Utilities", "Shopping", "Housing", "Other"]
         # Ensure current category is in list, default to Other if not
-        cat_idx = cats.index(current_cat) if current_cat in cats else 5
+        cat_idx = CATEGORIES.index(current_cat) if current_cat in CATEGORIES else CATEGORIES.index("Other")
         
-        new_cat = st.selectbox("Category", cats, index=cat_idx)
+        new_cat = st.selectbox("Category", CATEGORIES, index=cat_idx)
         new_desc = st.text_input("Description", value=row_data['Description'])
         new_amt = st.number_input("Amount", value=float(row_data['Amount']), min_value=0.0, format="%.2f")
         
@@ -168,10 +321,61 @@ def edit_transaction_dialog(tab_name, idx, row_data):
             st.session_state['success_msg'] = "✅ Updated!"
             st.rerun()
 
+# --- RECORDS TABLE ---
+# Only the visible page gets widgets; search/filter/sort run on the DataFrame.
+PAGE_SIZES = [10, 25, 50, 100]
+SORTS = {"Newest": ("Date", False), "Oldest": ("Date", True), "Amount ↓": ("Amount", False), "Amount ↑": ("Amount", True)}
+
+def render_records(tab_name, df):
+    k = "e" if tab_name == "Expenses" else "i"
+    label = "Category" if tab_name == "Expenses" else "Source"
+
+    f1, f2 = st.columns(2)
+    search = f1.text_input("Search", key=f"search_{k}")
+    picked = f2.multiselect(label, sorted(df[label].astype(str).unique()), key=f"filter_{k}")
+    s1, s2 = st.columns(2)
+    sort_by = s1.selectbox("Sort", list(SORTS), key=f"sort_{k}")
+    page_size = s2.selectbox("Rows per page", PAGE_SIZES, key=f"size_{k}")
+
+    if picked:
+        df = df[df[label].astype(str).isin(picked)]
+    if search:
+        hay = df[label].astype(str)
+        if tab_name == "Expenses": hay = hay + " " + df['Description'].astype(str)
+        df = df[hay.str.contains(search, case=False, regex=False)]
+    col, asc = SORTS[sort_by]
+    if sort_by != "Newest":  # rows arrive newest first already
+        df = df.sort_values(col, ascending=asc, kind="stable")
+
+    n_pages = max(1, -(-len(df) // page_size))
+    page = st.selectbox("Page", range(1, n_pages + 1), key=f"page_{k}", format_func=lambda p: f"{p} of {n_pages}")
+    st.caption(f"{len(df)} record(s)")
+    view = df.iloc[(page - 1) * page_size : page * page_size]
+
+    col1, col2, col3, col4, col5 = st.columns([2,3,2,1,1])
+    col1.markdown("**Date**"); col2.markdown("**Desc**" if k == "e" else "**Src**"); col3.markdown("**Amt**");
+    for idx, row in view.iterrows():
+        c1, c2, c3, c4, c5 = st.columns([2,3,2,1,1])
+        c1.write(row['Date'].strftime('%Y-%m-%d'))
+        c2.write(f"{row['Category']} - {row['Description']}" if k == "e" else row['Source'])
+        c3.write(f"RM{row['Amount']}")
+        
+        # EDIT BUTTON
+        if c4.button("✏️", key=f"edit_{k}_{idx}"):
+            edit_transaction_dialog(tab_name, idx, row)
+        
+        # DELETE BUTTON
+        c5.button("🗑", key=f"d{k}{idx}", on_click=delete_callback, args=(tab_name, idx))
+
 # --- SESSION STATE ---
 if 'user_sheet_name' not in st.session_state: st.session_state['user_sheet_name'] = None
 if 'username' not in st.session_state: st.session_state['username'] = None
 if 'current_view' not in st.session_state: st.session_state['current_view'] = "📥 Add Income"
+perf.start_run(st.session_state['username'] or "login")
+
+# Local backends are single-user: no login, no user directory
+if STORAGE_BACKEND != "sheets" and st.session_state['user_sheet_name'] is None:
+    st.session_state['user_sheet_name'] = st.session_state['username'] = get_setting("local_user", "local")
 
 # ==========================================
 #  SCENE 1: LOGIN
@@ -210,57 +414,73 @@ else:
     #  SCENE 2: MAIN APP
     # ==========================================
     try:
-        get_sh()
+        if STORAGE_BACKEND == "sheets": get_sh()
     except gspread.exceptions.SpreadsheetNotFound:
         st.warning("Account Pending Activation.")
         if st.button("Logout"):
-            st.session_state['user_sheet_name'] = None
+            logout()
             st.rerun()
         st.stop()
     except Exception as e:
         st.error(f"Connection Error: {e}")
         st.stop()
 
+    # Load the OCR model in the background while the user finds their receipt
+    if OCR_AVAILABLE: get_ocr_service().warm_up()
+
     with st.sidebar:
         st.write(f"User: **{st.session_state['username']}**")
         
-        with st.expander("⚙️ Change Password"):
-            with st.form("pwd_change_form"):
-                curr_pass = st.text_input("Current Password", type="password")
-                new_pass = st.text_input("New Password", type="password")
-                conf_pass = st.text_input("Confirm Password", type="password")
-                if st.form_submit_button("Update"):
-                    if check_login(st.session_state['username'], curr_pass):
-                        if new_pass == conf_pass and new_pass:
-                            if change_user_password(st.session_state['username'], new_pass):
-                                st.success("Updated! Logging out...")
-                                st.session_state['user_sheet_name'] = None
-                                st.rerun()
-                            else: st.error("Database Error.")
-                        else: st.error("Passwords mismatch.")
-                    else: st.error("Incorrect password.")
+        if STORAGE_BACKEND == "sheets":
+            with st.expander("⚙️ Change Password"):
+                with st.form("pwd_change_form"):
+                    curr_pass = st.text_input("Current Password", type="password")
+                    new_pass = st.text_input("New Password", type="password")
+                    conf_pass = st.text_input("Confirm Password", type="password")
+                    if st.form_submit_button("Update"):
+                        if check_login(st.session_state['username'], curr_pass):
+                            if new_pass == conf_pass and new_pass:
+                                if change_user_password(st.session_state['username'], new_pass):
+                                    st.success("Updated! Logging out...")
+                                    logout()
+                                    st.rerun()
+                                else: st.error("Database Error.")
+                            else: st.error("Passwords mismatch.")
+                        else: st.error("Incorrect password.")
+
+        # --- BACKGROUND WRITE STATUS ---
+        backend = get_backend()
+        st.session_state['pending_writes'] = backend.pending()
+        st.session_state['failed_writes'] = backend.pop_failed()
+        if st.session_state['pending_writes']:
+            st.caption(f"⏳ {st.session_state['pending_writes']} change(s) syncing to Google Sheets...")
+        for msg in st.session_state['failed_writes']:
+            st.error(f"⚠️ {msg}")
+
+        if STORAGE_BACKEND == "sheets":
+            if st.button("🔄 Sync with Google Sheets", disabled=st.session_state['pending_writes'] > 0):
+                backend.cache.invalidate()
+                st.session_state.pop('budget', None)
+                st.rerun()
 
         st.divider()
-        if st.button("Logout"):
-            st.session_state['user_sheet_name'] = None
+        if STORAGE_BACKEND == "sheets" and st.button("Logout"):
+            logout()
             st.rerun()
 
     # --- HELPERS ---
+    @perf.timed("load_data")
     def load_data():
-        sh = get_sh()
-        try: df_e = pd.DataFrame(sh.worksheet("Expenses").get_all_records())
-        except: df_e = pd.DataFrame()
-        try: df_i = pd.DataFrame(sh.worksheet("Income").get_all_records())
-        except: df_i = pd.DataFrame()
-        
-        if df_e.empty or 'Date' not in df_e.columns: df_e = pd.DataFrame(columns=["Date", "Description", "Category", "Amount"])
-        if df_i.empty or 'Date' not in df_i.columns: df_i = pd.DataFrame(columns=["Date", "Source", "Amount"])
-        
-        df_e['Date'] = pd.to_datetime(df_e['Date'], errors='coerce')
-        df_i['Date'] = pd.to_datetime(df_i['Date'], errors='coerce')
-        return df_e, df_i
-
-    df_exp, df_inc = load_data()
+        # With Sheets the refresh only pulls new rows into the local cache; the
+        # ledgers are rebuilt only when that (or a write) changed the data
+        backend = get_backend()
+        try:
+            backend.refresh()
+            return get_ledgers(STORAGE_BACKEND, data_version())
+        except Exception:
+            return Ledger.empty("Expenses"), Ledger.empty("Income")
+
+    led_exp, led_inc = load_data()
     
     if 'success_msg' in st.session_state:
         st.success(st.session_state['success_msg'])
@@ -269,7 +489,7 @@ else:
     st.title(f"💰 {st.session_state['username'].capitalize()}'s Budget")
 
     # --- NAVIGATION ---
-    nav_options = ["📥 Add Income", "💸 Add Expense", "📊 Analytics"]
+    nav_options = ["📥 Add Income", "💸 Add Expense", "📂 Import", "📊 Analytics", "📈 Trends"]
     selection = st.radio("", nav_options, horizontal=True, key="current_view")
     st.divider()
 
@@ -286,51 +506,88 @@ else:
     elif selection == "💸 Add Expense":
         st.header("New Expense")
         
+        if get_budget():
+            rollups = get_rollups(led_exp, led_inc)
+            if 'budget_check' in st.session_state:
+                month, cat = st.session_state.pop('budget_check')
+                hit = budget_usage(rollups, month).query("Category == @cat and Used > 1")
+                for row in hit.itertuples():
+                    st.toast(f"{row.Category} is over budget for {month}: RM {row.Spent:,.2f} of RM {row.Budget:,.2f}", icon="🚨")
+            usage = budget_usage(rollups, datetime.date.today().strftime('%Y-%m'))
+            for row in usage[usage['Used'] >= BUDGET_WARN].itertuples():
+                st.warning(f"{budget_icon(row.Used)} {row.Category}: RM {row.Spent:,.2f} of RM {row.Budget:,.2f} spent this month")
+        
         if OCR_AVAILABLE:
-            st.caption("🤖 Optional: Upload receipt to auto-detect total.")
+            ocr_status = {"ready": "ready", "loading": "warming up...", "failed": "failed to load"}.get(get_ocr_service().status(), "loads on first scan")
+            st.caption(f"🤖 Optional: Upload receipt to auto-detect total. (AI model: {ocr_status})")
             uploaded_file = st.file_uploader("Upload Receipt", type=['png', 'jpg', 'jpeg'])
             if uploaded_file:
-                if 'last_file' not in st.session_state or st.session_state['last_file'] != uploaded_file.name:
-                    with st.spinner("Scanning..."):
-                        val = scan_receipt_for_total(uploaded_file)
-                        if val > 0:
-                            st.session_state['exp_amount'] = val
-                            st.toast(f"Detected: RM{val}", icon="🤖")
-                        else:
-                            st.toast("No clear price found.", icon="⚠️")
-                    st.session_state['last_file'] = uploaded_file.name
+                if st.session_state.get('last_file') != uploaded_file.file_id:
+                    st.session_state['ocr_job'] = scan_receipt_for_total(uploaded_file)
+                    st.session_state['last_file'] = uploaded_file.file_id
+            if st.session_state.get('ocr_job') is not None:
+                if st.session_state['ocr_job'].done():
+                    apply_scan_result(st.session_state.pop('ocr_job'))
+                else:
+                    wait_for_scan()
 
         with st.form("expense_form", clear_on_submit=False):
             st.date_input("Date", datetime.date.today(), key="exp_date")
-            st.selectbox("Category", ["Food", "Transport", "Utilities", "Shopping", "Housing", "Other"], key="exp_cat")
+            st.selectbox("Category", CATEGORIES, key="exp_cat")
             st.text_input("Description", key="exp_desc")
             st.number_input("Amount", min_value=0.0, format="%.2f", key="exp_amount")
             st.form_submit_button("Save Expense", on_click=save_expense_callback)
 
-    # --- VIEW 3: ANALYTICS ---
+    # --- VIEW 3: BULK IMPORT ---
+    elif selection == "📂 Import":
+        st.header("Import Bank Statement")
+        st.caption("CSV or Excel export with a date, a description and either an amount or debit/credit columns.")
+        import_file = st.file_uploader("Statement", type=['csv', 'xlsx'])
+        c1, c2 = st.columns(2)
+        dayfirst = c1.checkbox("Dates are day-first (31/12/2024)", value=True)
+        all_expenses = c2.checkbox("Treat every row as an expense")
+        
+        if import_file:
+            try:
+                preview = importer.normalize(next(importer.read_chunks(import_file, import_file.name, chunk_rows=10)),
+                                             dayfirst=dayfirst, all_expenses=all_expenses)
+                st.dataframe(preview, hide_index=True)
+            except Exception as e:
+                st.error(f"Can't read this file: {e}")
+                preview = None
+            
+            if preview is not None and st.button("Import"):
+                import_file.seek(0)
+                bar = st.progress(0.0, text="Importing...")
+                size = max(import_file.size, 1)
+                with perf.timer("import"):
+                    stats = importer.import_file(import_file, import_file.name, save_rows, led_exp.frame(), led_inc.frame(),
+                                                 dayfirst=dayfirst, all_expenses=all_expenses,
+                                                 progress=lambda s: bar.progress(min(import_file.tell() / size, 1.0), text=f"{s['rows']} rows read..."))
+                bar.empty()
+                st.success(f"✅ Imported {stats['expenses']} expense(s) and {stats['income']} income row(s). "
+                           f"Skipped {stats['duplicates']} duplicate(s).")
+
+    # --- VIEW 4: ANALYTICS ---
     elif selection == "📊 Analytics":
         st.header("Spending Analysis")
-        all_dates = pd.concat([df_inc['Date'], df_exp['Date']]).dropna()
+        rollups = get_rollups(led_exp, led_inc)
         
-        if not all_dates.empty:
+        if rollups.periods(monthly=False):
             view_mode = st.radio("View Mode:", ["Monthly", "Annual"], horizontal=True)
-            f_i, f_e = df_inc.copy(), df_exp.copy()
             
             if view_mode == "Monthly":
-                periods = all_dates.dt.to_period('M').drop_duplicates().sort_values(ascending=False)
-                sel_p = st.selectbox("Select Month", periods)
-                f_i = f_i[f_i['Date'].dt.to_period('M') == sel_p]
-                f_e = f_e[f_e['Date'].dt.to_period('M') == sel_p]
+                sel_p = st.selectbox("Select Month", rollups.periods(monthly=True))
+                period = pd.Period(sel_p, 'M')
             else:
-                years = sorted(all_dates.dt.year.unique(), reverse=True)
-                sel_y = st.selectbox("Select Year", years)
-                f_i = f_i[f_i['Date'].dt.year == sel_y]
-                f_e = f_e[f_e['Date'].dt.year == sel_y]
+                sel_p = st.selectbox("Select Year", rollups.periods(monthly=False))
+                period = pd.Period(sel_p, 'Y')
             
-            f_i = f_i.sort_values("Date", ascending=False)
-            f_e = f_e.sort_values("Date", ascending=False)
+            # Totals and charts come from the rollups; only the records table needs rows
+            f_i = led_inc.period(period).frame(newest_first=True)
+            f_e = led_exp.period(period).frame(newest_first=True)
 
-            ti, te = f_i['Amount'].sum(), f_e['Amount'].sum()
+            ti, te = rollups.total("Income", sel_p), rollups.total("Expenses", sel_p)
             c1, c2, c3 = st.columns(3)
             c1.metric("Income", f"RM {ti:,.2f}")
             c2.metric("Expenses", f"RM {te:,.2f}")
@@ -338,11 +595,11 @@ else:
             
             st.divider()
 
-            if not f_e.empty:
+            pie = rollups.breakdown("Expenses", sel_p).reset_index()
+            if not pie.empty:
                 cl, cr = st.columns(2)
                 with cl:
                     st.subheader("Category Split")
-                    pie = f_e.groupby("Category")["Amount"].sum().reset_index()
                     st.plotly_chart(px.pie(pie, values='Amount', names='Category', hole=0.4), use_container_width=True)
                 with cr:
                     st.subheader("In vs Out")
@@ -351,55 +608,112 @@ else:
             else:
                 st.info("No data for charts.")
             
+            if get_budget():
+                st.subheader("🎯 Budget")
+                months = 1 if view_mode == "Monthly" else 12
+                for row in budget_usage(rollups, sel_p, months).itertuples():
+                    st.progress(min(row.Used, 1.0), text=f"{budget_icon(row.Used)} {row.Category}: RM {row.Spent:,.2f} of RM {row.Budget:,.2f}")
+            
             st.divider()
 
             with st.expander("Detailed Records", expanded=True):
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                    f_e.to_excel(writer, sheet_name='Expenses', index=False)
-                    f_i.to_excel(writer, sheet_name='Income', index=False)
-                
-                st.download_button("📥 Download Report (Excel)", data=buffer.getvalue(), 
-                                   file_name=f"Report_{view_mode}.xlsx", 
-                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                # Built on click (in the background), cached per user / period / data version
+                version = data_version()
+                c1, c2 = st.columns(2)
+                for col, fmt, label in ((c1, "xlsx", "📥 Download Report (Excel)"), (c2, "csv", "📄 Download CSV")):
+                    col.download_button(label, data=lambda fmt=fmt: build_report(fmt, sel_p, version, f_e, f_i, rollups),
+                                        file_name=f"Report_{sel_p}.{fmt}", mime=reports.FORMATS[fmt], on_click="ignore")
                 
                 st.markdown("---")
                 l, r = st.columns(2)
                 with l:
                     st.subheader("Expenses")
-                    # Added 5 columns for layout
-                    col1, col2, col3, col4, col5 = st.columns([2,3,2,1,1])
-                    col1.markdown("**Date**"); col2.markdown("**Desc**"); col3.markdown("**Amt**");
-                    for idx, row in f_e.iterrows():
-                        c1, c2, c3, c4, c5 = st.columns([2,3,2,1,1])
-                        c1.write(row['Date'].strftime('%Y-%m-%d'))
-                        c2.write(f"{row['Category']} - {row['Description']}")
-                        c3.write(f"RM{row['Amount']}")
-                        
-                        # EDIT BUTTON
-                        if c4.button("✏️", key=f"edit_e_{idx}"):
-                            edit_transaction_dialog("Expenses", idx, row)
-                        
-                        # DELETE BUTTON
-                        if c5.button("🗑", key=f"de{idx}", on_click=delete_callback, args=('Expenses', idx)):
-                            pass
-                            
+                    render_records("Expenses", f_e)
                 with r:
                     st.subheader("Income")
-                    col1, col2, col3, col4, col5 = st.columns([2,3,2,1,1])
-                    col1.markdown("**Date**"); col2.markdown("**Src**"); col3.markdown("**Amt**");
-                    for idx, row in f_i.iterrows():
-                        c1, c2, c3, c4, c5 = st.columns([2,3,2,1,1])
-                        c1.write(row['Date'].strftime('%Y-%m-%d'))
-                        c2.write(row['Source'])
-                        c3.write(f"RM{row['Amount']}")
-                        
-                        # EDIT BUTTON
-                        if c4.button("✏️", key=f"edit_i_{idx}"):
-                            edit_transaction_dialog("Income", idx, row)
-                            
-                        # DELETE BUTTON
-                        if c5.button("🗑", key=f"di{idx}", on_click=delete_callback, args=('Income', idx)):
-                            pass
+                    render_records("Income", f_i)
+        else:
+            st.info("No data found.")
+
+        with st.expander("🎯 Set Monthly Budgets"):
+            limits = get_budget()
+            cats = CATEGORIES + [c for c in limits if c not in CATEGORIES]
+            plan = st.data_editor(pd.DataFrame({"Category": cats, "Budgeted_Amount": [limits.get(c, 0.0) for c in cats]}),
+                                  hide_index=True, disabled=["Category"], key="budget_editor")
+            if st.button("Save Budget"):
+                try:
+                    st.session_state['budget'] = budget_dict(plan.values.tolist())
+                    get_backend().save_budget(st.session_state['budget'])
+                    st.session_state['success_msg'] = "✅ Budget Saved!"
+                except Exception as e:
+                    st.session_state.pop('budget', None)
+                    st.session_state['success_msg'] = f"⚠️ Budget not saved: {e}"
+                st.rerun()
+
+    # --- VIEW 5: TRENDS ---
+    elif selection == "📈 Trends":
+        st.header("Trends")
+        t = get_trends(data_version(), led_exp, led_inc)
+        totals, cats = t["totals"], t["categories"]
+        
+        if not totals.empty:
+            today = datetime.date.today()
+            proj = trends.project_month(cats, today)
+            last, avg = trends.last_month(totals, today)
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Spent This Month", f"RM {proj['So Far'].sum():,.2f}")
+            c2.metric("Projected by Month End", f"RM {proj['Projected'].sum():,.2f}",
+                      delta=None if avg is None else f"RM {proj['Projected'].sum() - avg:,.2f} vs {trends.ROLLING_MONTHS}-mo avg", delta_color="inverse")
+            c3.metric("Last Month", f"RM {last:,.2f}")
+            
+            st.divider()
+            
+            st.subheader("Income vs Expenses")
+            line = totals[["Income", "Expenses", "Expenses_Avg"]].rename(columns={"Expenses_Avg": f"Expenses ({trends.ROLLING_MONTHS}-mo avg)"})
+            st.plotly_chart(px.line(line, labels={"value": "RM", "Date": "", "variable": ""}), use_container_width=True)
+            
+            if not cats.empty:
+                st.subheader("By Category")
+                picked = st.multiselect("Categories", list(cats.columns), default=list(cats.columns), key="trend_cats")
+                smooth = st.checkbox(f"Show {trends.ROLLING_MONTHS}-month rolling average", key="trend_smooth")
+                series = (t["rolling"] if smooth else cats)[picked]
+                st.plotly_chart(px.line(series, labels={"value": "RM", "Date": "", "variable": ""}), use_container_width=True)
+                
+                l, r = st.columns(2)
+                with l:
+                    st.subheader("Month over Month")
+                    st.dataframe(trends.month_over_month(cats, today), column_config={
+                        "This Month": st.column_config.NumberColumn(format="RM %.2f"),
+                        "Last Month": st.column_config.NumberColumn(format="RM %.2f"),
+                        "Change": st.column_config.NumberColumn(format="RM %+.2f"),
+                        "Change %": st.column_config.NumberColumn(format="%+.0f%%")})
+                with r:
+                    st.subheader("Month-End Projection")
+                    st.dataframe(proj, column_config={
+                        "So Far": st.column_config.NumberColumn(format="RM %.2f"),
+                        "Projected": st.column_config.NumberColumn(format="RM %.2f")})
         else:
-            st.info("No data found.")
\ No newline at end of file
+            st.info("No data found.")
+
+# ==========================================
+#  PERF PANEL (only with perf = true, and only for users listed in perf_admins)
+# ==========================================
+# Sections that don't overlap; whatever the rerun spent outside them is widgets / rendering
+PERF_SECTIONS = ["get_sh", "load_data", "rollups", "trends", "import", "ocr_submit"]
+
+run = perf.end_run()
+admins = get_setting("perf_admins", [])
+if isinstance(admins, str): admins = [a.strip() for a in admins.split(",") if a.strip()]
+if run is not None and st.session_state['username'] in admins:
+    with st.sidebar.expander("🛠 Performance"):
+        summary = run.summary()
+        timed_ms = sum(summary['timings'].get(k, {}).get('ms', 0) for k in PERF_SECTIONS)
+        c1, c2 = st.columns(2)
+        c1.metric("This rerun", f"{summary['total_ms']:.0f} ms")
+        c2.metric("Sheets calls / min", f"{summary['sheets_calls_last_min']} / {perf.QUOTA_PER_MIN}")
+        rows = [{"Section": k, "ms": v['ms'], "Calls": v['n']} for k, v in summary['timings'].items()]
+        rows.append({"Section": "widgets / rendering", "ms": round(max(summary['total_ms'] - timed_ms, 0), 1), "Calls": 1})
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        if summary['sheets_calls']:
+            st.caption("Sheets API this rerun")
+            st.dataframe(pd.DataFrame([{"Request": k, "ms": v['ms'], "Calls": v['n']} for k, v in summary['sheets_calls'].items()]), hide_index=True)
@@ -0,0 +1,71 @@
+"""Time the Trends view computations on a synthetic ledger.
+
+Usage:
+    python benchmarks/bench_trends.py [--rows 100000] [--years 5] [--repeat 7] [--json out.json]
+
+Builds a random ledger (90% expenses, 10% income) spread over the given
+number of years, then times trends.compute() plus the month-over-month and
+projection tables, the way the Trends view calls them. Building the Ledgers
+is timed separately, since the app does that once per data version. Exits
+non-zero if the median is over the 100 ms budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synthetic  # noqa: E402
+import trends  # noqa: E402
+from ledger import Ledger  # noqa: E402
+
+BUDGET_MS = 100
+
+
+def run(led_e, led_i):
+    today = pd.Timestamp.today()
+    t = trends.compute(led_e, led_i)
+    trends.month_over_month(t["categories"], today)
+    trends.project_month(t["categories"], today)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    df_e, df_i = synthetic.frames(args.rows, args.years)
+    start = time.perf_counter()
+    led_e, led_i = Ledger.from_frame("Expenses", df_e), Ledger.from_frame("Income", df_i)
+    build_ms = (time.perf_counter() - start) * 1000
+    run(led_e, led_i)   # warm-up (imports, first-call caches)
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run(led_e, led_i)
+        times.append((time.perf_counter() - start) * 1000)
+
+    results = {
+        "rows": args.rows,
+        "years": args.years,
+        "median_ms": round(statistics.median(times), 1),
+        "max_ms": round(max(times), 1),
+        "ledger_build_ms": round(build_ms, 1),
+        "budget_ms": BUDGET_MS,
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+    if results["median_ms"] > BUDGET_MS: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
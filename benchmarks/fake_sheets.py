@@ -0,0 +1,166 @@
+"""In-memory stand-in for the parts of gspread the app uses.
+
+FakeClient().open(name) -> FakeSpreadsheet; .worksheet(tab) / .sheet1 / .add_worksheet
+-> FakeWorksheet, which keeps a list of rows (lists of strings) and supports
+get_all_values, get_all_records, get, batch_get, col_values, cell, find,
+append_row(s), update, update_cell, batch_update, batch_clear, clear, plus row deletes via
+Spreadsheet.batch_update. Every call is counted in `calls` and can be slowed
+down by `latency` seconds to imitate a network round trip.
+"""
+import re
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import gspread
+
+calls = Counter()
+
+
+def _cell(a1):
+    m = re.match(r"([A-Z]+)(\d*)", a1)
+    col = 0
+    for ch in m.group(1): col = col * 26 + ord(ch) - 64
+    return col, int(m.group(2)) if m.group(2) else None
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows=None, sheet_id=0):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = [[str(v) for v in r] for r in rows or []]
+
+    def _call(self, name):
+        calls[name] += 1
+        if self.spreadsheet.client.latency: time.sleep(self.spreadsheet.client.latency)
+
+    def _set(self, r, c, value):
+        while len(self.rows) < r: self.rows.append([])
+        row = self.rows[r - 1]
+        while len(row) < c: row.append("")
+        row[c - 1] = str(value)
+
+    # --- READS ---
+    def get_all_values(self):
+        self._call("get_all_values")
+        return [list(r) for r in self.rows]
+
+    def get_all_records(self):
+        self._call("get_all_records")
+        header, *rows = self.rows or [[]]
+        return [dict(zip(header, r + [""] * (len(header) - len(r)))) for r in rows]
+
+    def get(self, range_name):
+        self._call("get")
+        start, _, end = range_name.partition(":")
+        c1, r1 = _cell(start)
+        c2, r2 = _cell(end or start)
+        return [r[c1 - 1:c2] for r in self.rows[r1 - 1:r2]]
+
+    def batch_get(self, ranges):
+        self._call("batch_get")
+        out = []
+        for a1 in ranges:
+            c, r = _cell(a1)
+            row = self.rows[r - 1] if r - 1 < len(self.rows) else []
+            out.append([[row[c - 1]]] if c - 1 < len(row) and row[c - 1] != "" else [])
+        return out
+
+    def col_values(self, col):
+        self._call("col_values")
+        return [r[col - 1] if col - 1 < len(r) else "" for r in self.rows]
+
+    def cell(self, row, col):
+        self._call("cell")
+        r = self.rows[row - 1] if row - 1 < len(self.rows) else []
+        return SimpleNamespace(row=row, col=col, value=r[col - 1] if col - 1 < len(r) else None)
+
+    def find(self, query):
+        self._call("find")
+        for r, row in enumerate(self.rows, start=1):
+            if query in row: return SimpleNamespace(row=r, col=row.index(query) + 1, value=query)
+        return None
+
+    # --- WRITES ---
+    def append_row(self, row):
+        self._call("append_row")
+        self.rows.append([str(v) for v in row])
+
+    def append_rows(self, rows):
+        self._call("append_rows")
+        self.rows.extend([str(v) for v in r] for r in rows)
+
+    def update(self, range_name=None, values=None):
+        self._call("update")
+        c, r = _cell(range_name.split(":")[0])
+        for i, row in enumerate(values):
+            for j, v in enumerate(row): self._set(r + i, c + j, v)
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        self._set(row, col, value)
+
+    def batch_update(self, data):
+        self._call("batch_update")
+        for d in data:
+            c, r = _cell(d["range"].split(":")[0])
+            for i, row in enumerate(d["values"]):
+                for j, v in enumerate(row): self._set(r + i, c + j, v)
+
+    def batch_clear(self, ranges):
+        self._call("batch_clear")
+        for a1 in ranges:
+            start, _, end = a1.partition(":")
+            (c1, r1), (c2, r2) = _cell(start), _cell(end or start)
+            for row in self.rows[r1 - 1:r2]:
+                for c in range(c1 - 1, min(c2, len(row))): row[c] = ""
+
+    def clear(self):
+        self._call("clear")
+        self.rows = []
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title, tabs=None):
+        self.client = client
+        self.title = title
+        self.tabs = {}
+        for name, rows in (tabs or {}).items(): self.add_worksheet(name, rows=rows)
+
+    @property
+    def sheet1(self):
+        return next(iter(self.tabs.values()))
+
+    def worksheet(self, title):
+        calls["worksheet"] += 1
+        if title not in self.tabs: raise gspread.exceptions.WorksheetNotFound(title)
+        return self.tabs[title]
+
+    def add_worksheet(self, title, rows=None, cols=None):
+        # gspread's rows/cols are the grid size; here a list means initial contents
+        ws = FakeWorksheet(self, title, rows if isinstance(rows, list) else None, sheet_id=len(self.tabs))
+        self.tabs[title] = ws
+        return ws
+
+    def batch_update(self, body):
+        calls["spreadsheet.batch_update"] += 1
+        for req in body["requests"]:
+            rng = req["deleteDimension"]["range"]
+            ws = next(w for w in self.tabs.values() if w.id == rng["sheetId"])
+            del ws.rows[rng["startIndex"]:rng["endIndex"]]
+
+
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.files = {}
+
+    def create(self, title, tabs=None):
+        self.files[title] = FakeSpreadsheet(self, title, tabs)
+        return self.files[title]
+
+    def open(self, title):
+        calls["open"] += 1
+        if title not in self.files: raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self.files[title]
@@ -0,0 +1,61 @@
+"""Compare receipt OCR with and without the preprocessing pipeline.
+
+Usage:
+    python benchmarks/ocr_preprocess.py RECEIPTS_DIR --labels totals.csv [--json out.json]
+
+totals.csv has two columns, `file` and `total` (the correct receipt total).
+Every image is scanned with ocr.RAW (the original full-resolution path) and
+ocr.PREPROCESS, and the script reports latency and how many totals matched.
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ocr  # noqa: E402
+
+
+def run(images, labels, options):
+    times, hits = [], 0
+    for path in images:
+        with open(path, "rb") as f: data = f.read()
+        start = time.perf_counter()
+        total = ocr.scan_image(data, options)
+        times.append(time.perf_counter() - start)
+        if abs(total - labels[os.path.basename(path)]) < 0.005: hits += 1
+    return {
+        "images": len(images),
+        "mean_s": round(statistics.mean(times), 3),
+        "median_s": round(statistics.median(times), 3),
+        "max_s": round(max(times), 3),
+        "accuracy": round(hits / len(images), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images_dir")
+    parser.add_argument("--labels", required=True)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.labels, newline="") as f:
+        labels = {row["file"]: float(row["total"]) for row in csv.DictReader(f)}
+    images = [os.path.join(args.images_dir, name) for name in sorted(labels)
+              if os.path.exists(os.path.join(args.images_dir, name))]
+    if not images: sys.exit("No labelled images found.")
+
+    ocr.get_reader()   # keep the model load out of the timings
+    results = {"raw": run(images, labels, ocr.RAW), "preprocessed": run(images, labels, ocr.PREPROCESS)}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
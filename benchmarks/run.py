@@ -0,0 +1,224 @@
+"""Benchmark the app's data paths on synthetic ledgers and print JSON.
+
+Usage:
+    python benchmarks/run.py [--users 3] [--years 3] [--per-day 5] [--categories 6]
+                             [--login-users 2000] [--latency 0] [--repeat 5]
+                             [--images RECEIPTS_DIR] [--json out.json]
+
+Sections (each reports median / min / max milliseconds):
+  load_data   Sheets backend through the local cache and an in-memory fake of
+              gspread: cold (full download), warm rerun (nothing changed) and
+              rebuild after saving a row; plus the SQLite and Excel backends.
+  analytics   building the rollups, and a rerun's period slice + breakdown
+  export      the annual report as Excel and as CSV
+  check_login cold (reads the users sheet) and warm (index lookup)
+  ocr         scan_receipt_for_total's OCR service on the images in
+              RECEIPTS_DIR: first scan and cached re-scan (skipped without
+              easyocr / opencv or --images)
+
+The JSON also carries the git commit, the config and the fake Sheets API call
+counts per section, so runs from different versions can be diffed.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import fake_sheets  # noqa: E402
+import synthetic  # noqa: E402
+import ocr  # noqa: E402
+import reports  # noqa: E402
+from ledger import Ledger  # noqa: E402
+from local_cache import LedgerCache  # noqa: E402
+from rollups import Rollups  # noqa: E402
+from storage import COLUMNS, ExcelBackend, SheetsBackend, SQLiteBackend  # noqa: E402
+from users import UserDirectory  # noqa: E402
+from write_queue import WriteQueue  # noqa: E402
+
+
+def timed(fn, repeat=1, setup=None):
+    """`setup()`, if given, runs untimed before each sample."""
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(times), 2), "min_ms": round(min(times), 2),
+            "max_ms": round(max(times), 2), "runs": len(times)}
+
+
+def merge(samples):
+    """Combine one-shot timings (e.g. one per user) into a single entry."""
+    times = [s["median_ms"] for s in samples]
+    return {"median_ms": round(statistics.median(times), 2), "min_ms": round(min(times), 2),
+            "max_ms": round(max(times), 2), "runs": len(times)}
+
+
+def api_calls(since):
+    return {k: v - since.get(k, 0) for k, v in fake_sheets.calls.items() if v - since.get(k, 0)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def ledgers(backend):
+    # Same as app.get_ledgers
+    return tuple(Ledger.from_frame(tab, backend.load(tab)) for tab in ("Expenses", "Income"))
+
+
+# --- SECTIONS ---
+def bench_load(data, tmp, latency, repeat):
+    client = fake_sheets.FakeClient(latency=latency)
+    for name, (df_e, df_i) in data.items():
+        client.create(name, {"Expenses": synthetic.as_values(df_e, "Expenses"),
+                             "Income": synthetic.as_values(df_i, "Income")})
+    open_ws = lambda sheet, tab: client.open(sheet).worksheet(tab)
+    queue = WriteQueue(open_ws, width=lambda tab: len(COLUMNS[tab]))
+
+    before = dict(fake_sheets.calls)
+    cold, backends = [], {}
+    for name in data:
+        backend = SheetsBackend(name, LedgerCache(name, cache_dir=os.path.join(tmp, "cache")), queue, open_ws)
+        cold.append(timed(lambda: (backend.refresh(), ledgers(backend))))
+        backends[name] = backend
+    cold_calls = api_calls(before)
+
+    backend = backends[next(iter(data))]
+    before = dict(fake_sheets.calls)
+    warm = timed(backend.refresh, repeat)
+    warm_calls = api_calls(before)
+    # One saved expense (local cache + queue, as the app does), then the ledgers rebuilt from the cache
+    write = lambda: backend.append("Expenses", [["2024-01-01", "bench", "Food", 1.0]])
+    rebuild = timed(lambda: ledgers(backend), repeat, setup=write)
+    queue.flush()
+
+    df_e, df_i = next(iter(data.values()))
+    sqlite = SQLiteBackend(os.path.join(tmp, "bench.db"))
+    sqlite.append("Expenses", df_e[COLUMNS["Expenses"]].values.tolist())
+    sqlite.append("Income", df_i[COLUMNS["Income"]].values.tolist())
+    excel = ExcelBackend(os.path.join(tmp, "bench.xlsx"))
+    excel.append("Expenses", df_e[COLUMNS["Expenses"]].values.tolist())
+    excel.append("Income", df_i[COLUMNS["Income"]].values.tolist())
+
+    return {
+        "sheets_cold": {**merge(cold), "api_calls": cold_calls},
+        "sheets_warm_rerun": {**warm, "api_calls": warm_calls},
+        "sheets_rebuild_after_write": rebuild,
+        "sqlite": timed(lambda: ledgers(sqlite), repeat),
+        "excel": timed(lambda: ledgers(excel), repeat),
+    }
+
+
+def bench_analytics(led_e, led_i, repeat):
+    rollups = Rollups.build(led_e, led_i)
+    month = pd.Period(rollups.periods(monthly=True)[0], "M")
+
+    def rerun():
+        led_e.period(month).frame(newest_first=True)
+        led_i.period(month).frame(newest_first=True)
+        rollups.breakdown("Expenses", str(month))
+        rollups.total("Income", str(month)), rollups.total("Expenses", str(month))
+
+    return {
+        "build_rollups": timed(lambda: Rollups.build(led_e, led_i), repeat),
+        "monthly_rerun": timed(rerun, repeat),
+    }
+
+
+def bench_export(led_e, led_i, repeat):
+    rollups = Rollups.build(led_e, led_i)
+    year = rollups.periods(monthly=False)[0]
+    f_e = led_e.period(pd.Period(year, "Y")).frame(newest_first=True)
+    f_i = led_i.period(pd.Period(year, "Y")).frame(newest_first=True)
+    return {
+        "rows": len(f_e) + len(f_i),
+        "xlsx": timed(lambda: reports.build_xlsx(f_e, f_i, rollups, year), repeat),
+        "csv": timed(lambda: reports.build_csv(f_e, f_i), repeat),
+    }
+
+
+def bench_login(n, latency, repeat):
+    client = fake_sheets.FakeClient(latency=latency)
+    client.create("Budget_App_Users", {"Users": [["Username", "Password", "Sheet_Name"]] + synthetic.user_rows(n)})
+    users = UserDirectory(lambda: client.open("Budget_App_Users").sheet1)
+    last = f"user{n - 1}"
+    before = dict(fake_sheets.calls)
+    cold = timed(lambda: users.check(last, f"pw{n - 1}"))
+    cold_calls = api_calls(before)
+    before = dict(fake_sheets.calls)
+    warm = timed(lambda: users.check(last, f"pw{n - 1}"), repeat * 20)
+    return {"users": n, "cold": {**cold, "api_calls": cold_calls}, "warm": {**warm, "api_calls": api_calls(before)}}
+
+
+def bench_ocr(images_dir):
+    if not ocr.OCR_AVAILABLE: return {"skipped": "easyocr / opencv not installed"}
+    if not images_dir: return {"skipped": "no --images directory given"}
+    paths = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir)
+                   if f.lower().endswith((".png", ".jpg", ".jpeg")))
+    if not paths: return {"skipped": f"no images in {images_dir}"}
+    images = [open(p, "rb").read() for p in paths]
+    service = ocr.OCRService()
+    service.warm_up()
+    warm_up = timed(lambda: [f.result() for f in service.warmup])
+    first = [timed(lambda img=img: service.submit(img).result()) for img in images]
+    cached = [timed(lambda img=img: service.submit(img).result()) for img in images]
+    service.pool.shutdown()
+    return {"images": len(images), "warm_up": warm_up, "first_scan": merge(first), "cached_scan": merge(cached)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--per-day", type=float, default=5)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--login-users", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets call")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--images", help="folder of receipt images for the OCR section")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    data = synthetic.users(args.users, args.years, args.per_day, args.categories)
+    df_e, df_i = next(iter(data.values()))
+    led_e, led_i = Ledger.from_frame("Expenses", df_e), Ledger.from_frame("Income", df_i)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        load = bench_load(data, tmp, args.latency, args.repeat)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "config": {**vars(args), "rows_per_user": len(df_e) + len(df_i)},
+        "load_data": load,
+        "analytics": bench_analytics(led_e, led_i, args.repeat),
+        "export": bench_export(led_e, led_i, args.repeat),
+        "check_login": bench_login(args.login_users, args.latency, args.repeat),
+        "ocr": bench_ocr(args.images),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
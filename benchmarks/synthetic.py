@@ -0,0 +1,69 @@
+"""Synthetic ledgers and user lists for the benchmarks.
+
+    frames(rows, years)          -> (expenses, income) DataFrames
+    users(n, years, per_day)     -> {sheet name: (expenses, income)}
+    user_rows(n)                 -> Budget_App_Users rows
+    as_values(df, tab)           -> what Worksheet.get_all_values() would return
+
+Dates are ISO strings and every row has an ID, like a sheet written by the app.
+"""
+import numpy as np
+import pandas as pd
+
+from storage import CATEGORIES, COLUMNS
+
+SOURCES = ["Salary", "Freelance", "Dividends", "Gift"]
+WORDS = ["Nasi Lemak", "Petrol", "Grab", "TNB", "Shopee", "Rent", "Coffee", "Groceries", "Parking", "Unifi"]
+
+
+def categories(n=len(CATEGORIES)):
+    """The app's categories, padded with made-up ones if n is larger."""
+    return (CATEGORIES + [f"Category {i}" for i in range(len(CATEGORIES) + 1, n + 1)])[:n]
+
+
+def _ids(rng, n):
+    return pd.Series(rng.integers(0, 16 ** 12, n, dtype=np.int64)).map("{:012x}".format).values
+
+
+def frames(rows, years, n_categories=len(CATEGORIES), seed=0):
+    """`rows` transactions (90% expenses, 10% income) spread over the last `years` years."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=years)
+    span = (end - start).days
+
+    def dates(n):
+        return (start + pd.to_timedelta(rng.integers(0, span + 1, n), unit="D")).strftime("%Y-%m-%d")
+
+    n_i = rows // 10
+    n_e = rows - n_i
+    expenses = pd.DataFrame({
+        "Date": dates(n_e),
+        "Description": rng.choice(WORDS, n_e),
+        "Category": rng.choice(categories(n_categories), n_e),
+        "Amount": rng.gamma(2.0, 25.0, n_e).round(2),
+        "ID": _ids(rng, n_e),
+    })
+    income = pd.DataFrame({
+        "Date": dates(n_i),
+        "Source": rng.choice(SOURCES, n_i),
+        "Amount": rng.gamma(4.0, 500.0, n_i).round(2),
+        "ID": _ids(rng, n_i),
+    })
+    return expenses, income
+
+
+def users(n, years, per_day, n_categories=len(CATEGORIES), seed=0):
+    """One ledger per user; per_day is the average number of transactions a day."""
+    rows = max(1, int(per_day * 365 * years))
+    return {f"Budget_User{u}": frames(rows, years, n_categories, seed + u) for u in range(n)}
+
+
+def user_rows(n):
+    return [[f"user{u}", f"pw{u}", f"Budget_User{u}"] for u in range(n)]
+
+
+def as_values(df, tab):
+    """Header + rows of strings, the way Sheets hands them back."""
+    df = df[COLUMNS[tab]]
+    return [list(COLUMNS[tab])] + df.astype(str).values.tolist()
@@ -0,0 +1,139 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+
+from openpyxl import Workbook, load_workbook
+
+from storage import COLUMNS, with_id
+
+# --- LOCAL EXCEL ENGINE (main.py) ---
+# Keeps my_budget_data.xlsx open for the whole session. New rows are buffered
+# and written out every FLUSH_INTERVAL seconds (and at exit) with one save to a
+# temp file that then replaces the workbook, so a crash mid-save never leaves
+# a half-written file. If something else (e.g. the Streamlit app) saved the
+# file since we read it, it is re-read before our rows go on top.
+
+FLUSH_INTERVAL = 5.0
+
+# Same sheets as setup_storage.py; Expenses / Income also get the app's ID column
+SHEETS = {
+    "Expenses": COLUMNS["Expenses"],
+    "Income": COLUMNS["Income"],
+    "Savings": ["Date", "Description", "Amount"],
+    "Budget_Plan": ["Category", "Budgeted_Amount"],
+}
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+class ExcelStore:
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.appends = []   # (sheet, row) in the order they were added
+        self.puts = {}      # (sheet, key) -> row, replaces the row with that first cell
+        self._load()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="excel-flush", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            self.wb = load_workbook(self.path)
+            self.mtime = os.path.getmtime(self.path)
+        else:
+            self.wb = Workbook()
+            self.wb.remove(self.wb.active)
+            self.mtime = None
+
+    def _sheet(self, name):
+        if name not in self.wb.sheetnames:
+            self.wb.create_sheet(name).append(SHEETS[name])
+        ws = self.wb[name]
+        # Files from setup_storage.py have no ID header yet
+        if name in COLUMNS and ws.cell(row=1, column=len(COLUMNS[name])).value != "ID":
+            ws.cell(row=1, column=len(COLUMNS[name]), value="ID")
+        return ws
+
+    # --- PUBLIC API ---
+    def append(self, sheet, row):
+        if sheet not in SHEETS: raise KeyError(f"Unknown sheet '{sheet}'")
+        if sheet in COLUMNS: row = with_id(sheet, row)
+        with self.lock:
+            self.appends.append((sheet, list(row)))
+
+    def put(self, sheet, row):
+        """Insert or replace the row whose first cell matches (e.g. a Budget_Plan category)."""
+        if sheet not in SHEETS: raise KeyError(f"Unknown sheet '{sheet}'")
+        with self.lock:
+            self.puts[(sheet, row[0])] = list(row)
+
+    def rows(self, sheet):
+        """Data rows of a sheet, including ones not flushed yet."""
+        with self.lock:
+            out = [list(r) for r in self._sheet(sheet).iter_rows(min_row=2, values_only=True)] if sheet in self.wb.sheetnames else []
+            out += [row for s, row in self.appends if s == sheet]
+            for (s, key), row in self.puts.items():
+                if s != sheet: continue
+                match = next((i for i, r in enumerate(out) if r and r[0] == key), None)
+                if match is None: out.append(row)
+                else: out[match] = row
+            return out
+
+    def pending(self):
+        with self.lock:
+            return len(self.appends) + len(self.puts)
+
+    def flush(self):
+        with self.lock:
+            if not self.appends and not self.puts: return
+            if self.mtime is not None and os.path.exists(self.path) and os.path.getmtime(self.path) != self.mtime:
+                self._load()
+            try:
+                for sheet, row in self.appends:
+                    self._sheet(sheet).append(row)
+                for (sheet, key), row in self.puts.items():
+                    ws = self._sheet(sheet)
+                    match = next((c.row for (c,) in ws.iter_rows(min_row=2, max_col=1) if c.value == key), None)
+                    if match is None: ws.append(row)
+                    else:
+                        for col, value in enumerate(row, start=1): ws.cell(row=match, column=col, value=value)
+                self._save()
+            except Exception:
+                # Drop the half-applied rows; they're still buffered for the next try
+                self._load()
+                raise
+            self.appends, self.puts = [], {}
+
+    def close(self):
+        self.stop.set()
+        self.flush()
+
+    # --- INTERNALS ---
+    def _save(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=folder)
+        os.close(fd)
+        try:
+            self.wb.save(tmp)
+            # mkstemp makes the file 0600; keep the workbook readable by whoever could read it before
+            if os.path.exists(self.path): shutil.copymode(self.path, tmp)
+            else: os.chmod(tmp, 0o666 & ~_umask())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+        self.mtime = os.path.getmtime(self.path)
+
+    def _run(self):
+        while not self.stop.wait(self.flush_interval):
+            try: self.flush()
+            except Exception as e: print(f"❌ Error saving data: {e}")
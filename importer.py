@@ -0,0 +1,164 @@
+import re
+from collections import Counter
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# --- BULK IMPORT ---
+# Streams a CSV / Excel bank export in chunks, normalises each chunk into the
+# app's Expenses / Income rows, guesses a category from the description, skips
+# rows that are already in the ledger and hands each chunk to the backend as
+# one batched append.
+
+CHUNK_ROWS = 500
+
+# Header names seen in bank exports, matched case-insensitively
+DATE_COLS = ["date", "transaction date", "posting date", "value date", "txn date"]
+DESC_COLS = ["description", "details", "narration", "transaction description", "merchant", "reference", "particulars"]
+AMOUNT_COLS = ["amount", "transaction amount", "amount (rm)", "amount(rm)"]
+DEBIT_COLS = ["debit", "withdrawal", "withdrawals", "money out", "debit amount"]
+CREDIT_COLS = ["credit", "deposit", "deposits", "money in", "credit amount"]
+
+# Whole words only ("bus" isn't "business"). First matching category wins, so
+# "grab food" is Food before "grab" is Transport
+KEYWORDS = {
+    "Food": ["grab food", "grabfood", "foodpanda", "restaurant", "cafe", "coffee", "kopi", "mamak", "nasi",
+             "mcd", "mcdonald", "mcdonalds", "kfc", "starbucks", "bakery", "tesco", "aeon", "mydin", "lotus", "speedmart",
+             "grocer", "grocery", "groceries"],
+    "Transport": ["petrol", "petronas", "shell", "caltex", "bhp", "grab", "toll", "touch n go", "tng", "parking",
+                  "mrt", "lrt", "ktm", "rapid", "rapidkl", "bus", "taxi"],
+    "Utilities": ["tnb", "tenaga", "air selangor", "syabas", "indah water", "unifi", "maxis", "celcom", "digi",
+                  "u mobile", "astro", "electric", "electricity", "water bill", "internet"],
+    "Shopping": ["shopee", "lazada", "zalora", "uniqlo", "ikea", "mr diy", "watsons", "guardian", "mall"],
+    "Housing": ["rent", "sewa", "mortgage", "maintenance fee", "housing loan", "property"],
+}
+
+
+# --- READING ---
+def read_chunks(file, name, chunk_rows=CHUNK_ROWS):
+    """Yield raw DataFrames of at most chunk_rows rows without loading the whole file."""
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        wb = load_workbook(file, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk: yield pd.DataFrame(chunk, columns=header)
+        wb.close()
+    else:
+        yield from pd.read_csv(file, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+
+
+def _pick(columns, candidates):
+    lookup = {str(c).strip().lower(): c for c in columns}
+    return next((lookup[c] for c in candidates if c in lookup), None)
+
+
+def _to_number(values):
+    """'RM1,234.50', '(12.00)', '12.00 DR' -> floats (DR and brackets are negative)."""
+    s = values.astype(str).str.strip().str.upper()
+    negative = s.str.startswith("-") | s.str.startswith("(") | s.str.endswith("DR")
+    digits = s.str.replace(r"[^0-9.]", "", regex=True)
+    number = pd.to_numeric(digits, errors="coerce")
+    return number.where(~negative, -number)
+
+
+def _to_date(values, dayfirst):
+    """dayfirst only applies to 01/02/2024-style dates, never to ISO ones like 2024-03-02."""
+    s = values.astype(str).str.strip()
+    iso = s.str.match(r"\d{4}-\d{2}-\d{2}")
+    dates = pd.to_datetime(s.where(~iso), errors="coerce", dayfirst=dayfirst, format="mixed")
+    return dates.fillna(pd.to_datetime(s.where(iso).str[:10], errors="coerce", format="%Y-%m-%d"))
+
+
+# --- NORMALISING ---
+def categorize(descriptions):
+    low = descriptions.fillna("").astype(str).str.lower()
+    cats = pd.Series("Other", index=descriptions.index)
+    # Later categories first, so earlier ones overwrite them on overlap
+    for category, words in reversed(list(KEYWORDS.items())):
+        cats[low.str.contains(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b", regex=True)] = category
+    return cats
+
+
+def normalize(chunk, dayfirst=True, all_expenses=False):
+    """Raw export chunk -> DataFrame with Kind (Expenses/Income), Date, Description, Category, Amount."""
+    date_col, desc_col = _pick(chunk.columns, DATE_COLS), _pick(chunk.columns, DESC_COLS)
+    amount_col = _pick(chunk.columns, AMOUNT_COLS)
+    debit_col, credit_col = _pick(chunk.columns, DEBIT_COLS), _pick(chunk.columns, CREDIT_COLS)
+    if date_col is None or (amount_col is None and debit_col is None and credit_col is None):
+        raise ValueError("Couldn't find a date and an amount (or debit/credit) column in this file.")
+
+    if amount_col is not None:
+        signed = _to_number(chunk[amount_col])
+    else:
+        debit = _to_number(chunk[debit_col]).abs().fillna(0) if debit_col is not None else 0
+        credit = _to_number(chunk[credit_col]).abs().fillna(0) if credit_col is not None else 0
+        signed = credit - debit
+
+    out = pd.DataFrame({
+        "Date": _to_date(chunk[date_col], dayfirst),
+        "Description": chunk[desc_col].fillna("").astype(str).str.strip() if desc_col is not None else "",
+        "Amount": signed.abs().round(2),
+        "Kind": "Expenses" if all_expenses else signed.lt(0).map({True: "Expenses", False: "Income"}),
+    })
+    out = out[out["Date"].notna() & out["Amount"].gt(0)]
+    out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
+    out["Category"] = categorize(out["Description"])
+    return out
+
+
+# --- DUPLICATES ---
+def _keys(dates, descs, amounts):
+    return zip(pd.to_datetime(dates, errors="coerce").dt.strftime("%Y-%m-%d"),
+               descs.fillna("").astype(str).str.strip().str.lower(),
+               pd.to_numeric(amounts, errors="coerce").round(2))
+
+
+class Deduper:
+    """Drops imported rows already in the ledger. Counts are kept per key, so
+    two genuine identical coffees on one day are only dropped if the ledger
+    already has two."""
+
+    def __init__(self, df_exp, df_inc):
+        self.seen = {
+            "Expenses": Counter(_keys(df_exp["Date"], df_exp["Description"], df_exp["Amount"])),
+            "Income": Counter(_keys(df_inc["Date"], df_inc["Source"], df_inc["Amount"])),
+        }
+
+    def filter(self, norm):
+        keep = []
+        for kind, key in zip(norm["Kind"], _keys(norm["Date"], norm["Description"], norm["Amount"])):
+            if self.seen[kind][key] > 0:
+                self.seen[kind][key] -= 1
+                keep.append(False)
+            else:
+                keep.append(True)
+        return norm[keep]
+
+
+# --- PIPELINE ---
+def import_file(file, name, append, df_exp, df_inc, dayfirst=True, all_expenses=False, progress=None):
+    """Stream `file` into the ledger. append(tab, rows) writes one batch.
+
+    Returns counts of imported expenses / income and skipped duplicates.
+    """
+    dedupe = Deduper(df_exp, df_inc)
+    stats = {"expenses": 0, "income": 0, "duplicates": 0, "rows": 0}
+    for chunk in read_chunks(file, name):
+        stats["rows"] += len(chunk)
+        norm = normalize(chunk, dayfirst=dayfirst, all_expenses=all_expenses)
+        fresh = dedupe.filter(norm)
+        stats["duplicates"] += len(norm) - len(fresh)
+        exp = fresh[fresh["Kind"] == "Expenses"]
+        inc = fresh[fresh["Kind"] == "Income"]
+        if len(exp): append("Expenses", exp[["Date", "Description", "Category", "Amount"]].values.tolist())
+        if len(inc): append("Income", inc[["Date", "Description", "Amount"]].values.tolist())
+        stats["expenses"] += len(exp)
+        stats["income"] += len(inc)
+        if progress: progress(stats)
+    return stats
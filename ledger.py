@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from storage import COLUMNS, empty_frame
+
+# --- COMPACT LEDGER ---
+# What the app keeps in memory for a tab, built once per data version and
+# shared by every session on that sheet:
+#   Date      datetime64, rows sorted by it (undated rows last)
+#   Category  categorical for Expenses, Source for Income (a few codes, not a string per row)
+#   Cents     int64 amount in cents, so totals add up exactly
+# Period filters are two binary searches on the sorted dates and a slice,
+# instead of a boolean mask over every row.
+
+LABEL = {"Expenses": "Category", "Income": "Source"}
+
+
+def to_cents(amounts):
+    values = pd.to_numeric(amounts, errors='coerce') if pd.api.types.is_numeric_dtype(amounts) \
+        else pd.to_numeric(amounts.astype(str).str.replace(',', ''), errors='coerce')
+    return (values.fillna(0.0) * 100).round().astype('int64')
+
+
+class Ledger:
+    def __init__(self, tab, df):
+        """`df` is already typed and sorted; use Ledger.from_frame for backend rows."""
+        self.tab = tab
+        self.df = df
+
+    @classmethod
+    def from_frame(cls, tab, df):
+        """Backend frame (Date / label / Amount columns, ID index) -> Ledger."""
+        label = LABEL[tab]
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        order = np.argsort(dates.values, kind='stable')   # NaT sorts last
+        out = pd.DataFrame({c: df[c] for c in COLUMNS[tab][:-1] if c not in ('Date', 'Amount')})
+        out.insert(0, 'Date', dates)
+        out[label] = out[label].fillna("").astype(str).astype('category')
+        out['Cents'] = to_cents(df['Amount'])
+        return cls(tab, out.iloc[order])
+
+    @classmethod
+    def empty(cls, tab):
+        return cls.from_frame(tab, empty_frame(tab))
+
+    def __len__(self):
+        return len(self.df)
+
+    def between(self, start, end):
+        """Rows with start <= Date <= end, as a slice of this ledger."""
+        dates = self.df['Date'].values
+        i = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        j = np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return Ledger(self.tab, self.df.iloc[i:j])
+
+    def period(self, period):
+        return self.between(period.start_time, period.end_time)
+
+    def dated(self):
+        """The rows that have a date (they're all before the undated ones)."""
+        return self.df.iloc[:int(self.df['Date'].notna().sum())]
+
+    def total(self):
+        return int(self.df['Cents'].sum()) / 100
+
+    def frame(self, newest_first=False):
+        """Plain frame with an Amount column in RM, for tables, exports and the importer."""
+        df = self.df.iloc[::-1] if newest_first else self.df
+        return df.drop(columns='Cents').assign(Amount=df['Cents'] / 100)
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+
+import pandas as pd
+
+from storage import COLUMNS, new_id
+
+# --- LOCAL READ-THROUGH CACHE ---
+# Each user sheet gets a small SQLite file holding a copy of its Expenses and
+# Income tabs. Reads come from disk; Sheets is only asked for rows appended
+# since the last sync, plus a full re-download now and then to pick up edits
+# made directly in the spreadsheet.
+
+CACHE_DIR = os.environ.get("BUDGET_CACHE_DIR", ".budget_cache")
+SYNC_TTL = 30             # seconds before checking Sheets for new rows
+FULL_SYNC_TTL = 15 * 60   # seconds before re-downloading the whole tab
+
+
+def _col_letter(n):
+    return chr(ord('A') + n - 1)
+
+
+def _pad(rows, width):
+    return [(list(r) + [""] * width)[:width] for r in rows]
+
+
+class RowIndex:
+    """Row ID -> current position in the sheet (0 = sheet row 2).
+
+    Each ID keeps the slot it was given; deleted slots are remembered in a
+    sorted list, so a delete doesn't have to renumber every later row.
+    """
+
+    def __init__(self, ids=()):
+        self.slots = {row_id: i for i, row_id in enumerate(ids)}
+        self.deleted = []
+        self.next_slot = len(self.slots)
+
+    def add(self, row_id):
+        self.slots[row_id] = self.next_slot
+        self.next_slot += 1
+
+    def pos(self, row_id):
+        slot = self.slots.get(row_id)
+        if slot is None: return None
+        return slot - bisect_left(self.deleted, slot)
+
+    def remove(self, row_id):
+        slot = self.slots.pop(row_id, None)
+        if slot is not None: insort(self.deleted, slot)
+
+
+class LedgerCache:
+    """On-disk copy of one user's sheet, plus an in-memory ID -> row index."""
+
+    def __init__(self, sheet_name, cache_dir=CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        # Readable name plus a hash, since "Ali's Budget" and "Ali_s Budget" sanitize alike
+        safe_name = re.sub(r"[^\w.-]", "_", sheet_name)
+        digest = hashlib.sha256(sheet_name.encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"{safe_name}-{digest}.sqlite")
+        self.lock = threading.Lock()
+        self.versions = {tab: 0 for tab in COLUMNS}   # bumped whenever a tab's rows change
+        self.index = {}                               # tab -> RowIndex, built lazily
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (tab TEXT PRIMARY KEY, rows INTEGER, synced REAL, full_synced REAL)")
+            for tab, cols in COLUMNS.items():
+                col_sql = ", ".join(f'"{c}"' for c in cols)
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{tab}" (pos INTEGER, {col_sql})')
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{tab}_pos" ON "{tab}" (pos)')
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{tab}_id" ON "{tab}" (ID)')
+
+    # --- READS ---
+    def load(self, tab, get_ws, sync=True):
+        """Return the tab as a DataFrame indexed by row ID, syncing from Sheets only if stale.
+
+        `get_ws` is only called when a sync is actually needed. Pass
+        sync=False while local writes are still on their way to Sheets,
+        otherwise a sync would overwrite them with the older remote copy.
+        """
+        with self.lock:
+            self._sync(tab, get_ws, sync)
+            return self._read(tab)
+
+    def refresh(self, tab, get_ws, sync=True):
+        """Like load(), but only brings the cache up to date (bumping versions) without reading it."""
+        with self.lock:
+            self._sync(tab, get_ws, sync)
+
+    def invalidate(self, tab=None):
+        """Force a full re-download on the next load."""
+        with self.lock, self.conn:
+            if tab is None: self.conn.execute("DELETE FROM meta")
+            else: self.conn.execute("DELETE FROM meta WHERE tab = ?", (tab,))
+
+    def position(self, tab, row_id):
+        with self.lock:
+            return self._index(tab).pos(row_id)
+
+    def _meta(self, tab):
+        row = self.conn.execute("SELECT rows, synced, full_synced FROM meta WHERE tab = ?", (tab,)).fetchone()
+        return row
+
+    def _index(self, tab):
+        if tab not in self.index:
+            ids = [r[0] for r in self.conn.execute(f'SELECT ID FROM "{tab}" ORDER BY pos')]
+            self.index[tab] = RowIndex(ids)
+        return self.index[tab]
+
+    def _read(self, tab):
+        col_sql = ", ".join(f'"{c}"' for c in COLUMNS[tab])
+        df = pd.read_sql_query(f'SELECT {col_sql} FROM "{tab}" ORDER BY pos', self.conn, index_col='ID')
+        df.index.name = None
+        df['Amount'] = pd.to_numeric(df['Amount'].astype(str).str.replace(',', ''), errors='coerce').fillna(0.0).astype(float)
+        return df
+
+    # --- SYNC ---
+    def _sync(self, tab, get_ws, sync):
+        meta = self._meta(tab)
+        now = time.time()
+        if meta is None or (sync and now - meta[2] > FULL_SYNC_TTL):
+            self._full_sync(tab, get_ws())
+        elif sync and now - meta[1] > SYNC_TTL:
+            self._pull_new_rows(tab, get_ws(), meta[0])
+
+    def _full_sync(self, tab, ws):
+        width = len(COLUMNS[tab])
+        values = ws.get_all_values()
+        header, rows = (values[0], values[1:]) if values else (COLUMNS[tab], [])
+        # Columns are read by position (A = Date, ...), the same way the write
+        # queue finds IDs and writes rows, so reads and writes always agree
+        rows = _pad(rows, width)
+        self._backfill_ids(tab, ws, 0, rows, with_header=_pad([header], width)[0][-1] != "ID")
+        now = time.time()
+        with self.conn:
+            self.conn.execute(f'DELETE FROM "{tab}"')
+            self._insert(tab, 0, rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)", (tab, len(rows), now, now))
+        self.index[tab] = RowIndex(r[-1] for r in rows)
+        self.versions[tab] += 1
+
+    def _pull_new_rows(self, tab, ws, known_rows):
+        width = len(COLUMNS[tab])
+        new_rows = _pad(ws.get(f"A{known_rows + 2}:{_col_letter(width)}"), width)
+        self._backfill_ids(tab, ws, known_rows, new_rows)
+        with self.conn:
+            self._insert(tab, self._next_pos(tab), new_rows)
+            self.conn.execute("UPDATE meta SET rows = ?, synced = ? WHERE tab = ?", (known_rows + len(new_rows), time.time(), tab))
+        index = self._index(tab)
+        for r in new_rows: index.add(r[-1])
+        if new_rows: self.versions[tab] += 1
+
+    def _backfill_ids(self, tab, ws, start, rows, with_header=False):
+        # Rows typed straight into the sheet (or from before IDs existed) get one now
+        missing = [r for r in rows if not r[-1]]
+        if not missing and not with_header: return
+        for r in missing: r[-1] = new_id()
+        col = _col_letter(len(COLUMNS[tab]))
+        values = [[r[-1]] for r in rows]
+        if with_header:
+            ws.update(range_name=f"{col}1:{col}{start + len(rows) + 1}", values=[["ID"]] + values)
+        else:
+            ws.update(range_name=f"{col}{start + 2}:{col}{start + len(rows) + 1}", values=values)
+
+    def _next_pos(self, tab):
+        return self.conn.execute(f'SELECT COALESCE(MAX(pos) + 1, 0) FROM "{tab}"').fetchone()[0]
+
+    def _insert(self, tab, start, rows):
+        width = len(COLUMNS[tab])
+        params = [(start + i, *r) for i, r in enumerate(_pad(rows, width))]
+        marks = ", ".join("?" * (width + 1))
+        self.conn.executemany(f'INSERT INTO "{tab}" VALUES ({marks})', params)
+
+    # --- WRITE-THROUGH ---
+    # The app applies its own writes here so the next read doesn't have to go
+    # back to Sheets. If the tab was never synced there is nothing to patch.
+    # update() and delete() return (row before the change, sheet position).
+    def append(self, tab, rows):
+        with self.lock, self.conn:
+            meta = self._meta(tab)
+            if meta is None: return
+            self._insert(tab, self._next_pos(tab), rows)
+            self.conn.execute("UPDATE meta SET rows = rows + ? WHERE tab = ?", (len(rows), tab))
+            index = self._index(tab)
+            for r in rows: index.add(r[-1])
+            self.versions[tab] += 1
+
+    def update(self, tab, row_id, data):
+        set_sql = ", ".join(f'"{c}" = ?' for c in COLUMNS[tab])
+        with self.lock, self.conn:
+            if self._meta(tab) is None: return None, None
+            old = self._row(tab, row_id)
+            self.conn.execute(f'UPDATE "{tab}" SET {set_sql} WHERE ID = ?', (*data, row_id))
+            self.versions[tab] += 1
+            return old, self._index(tab).pos(row_id)
+
+    def delete(self, tab, row_id):
+        with self.lock, self.conn:
+            if self._meta(tab) is None: return None, None
+            old = self._row(tab, row_id)
+            if old is None: return None, None
+            index = self._index(tab)
+            pos = index.pos(row_id)
+            self.conn.execute(f'DELETE FROM "{tab}" WHERE ID = ?', (row_id,))
+            self.conn.execute("UPDATE meta SET rows = rows - 1 WHERE tab = ?", (tab,))
+            index.remove(row_id)
+            self.versions[tab] += 1
+            return old, pos
+
+    def _row(self, tab, row_id):
+        col_sql = ", ".join(f'"{c}"' for c in COLUMNS[tab])
+        row = self.conn.execute(f'SELECT {col_sql} FROM "{tab}" WHERE ID = ?', (row_id,)).fetchone()
+        return list(row) if row else None
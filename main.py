@@ -1,64 +1,110 @@
 import os
-from openpyxl import load_workbook
 from datetime import datetime
+from excel_store import ExcelStore
 
 FILE_NAME = "my_budget_data.xlsx"
 
+# The workbook stays open; rows are buffered and saved in the background (see excel_store.py)
+store = None
+
+def get_store():
+    global store
+    if store is None: store = ExcelStore(FILE_NAME)
+    return store
+
 def save_to_excel(sheet_name, data):
-    """Opens the Excel file and appends a row to the specific sheet."""
+    """Queues a row for the specific sheet (written out within a few seconds, and at exit)."""
     try:
-        wb = load_workbook(FILE_NAME)
-        ws = wb[sheet_name]
-        ws.append(data) # Adds the list of data to the next empty row
-        wb.save(FILE_NAME)
+        get_store().append(sheet_name, data)
         print(f"✅ Successfully saved to {sheet_name}!")
     except Exception as e:
         print(f"❌ Error saving data: {e}")
 
-def add_expense():
-    print("\n--- 💸 Add New Expense ---")
-    
-    # 1. Get Date (Default to today if empty)
+def ask_date():
+    # Default to today if empty
     date_input = input("Date (YYYY-MM-DD) [Press Enter for Today]: ")
     if date_input == "":
         date_input = datetime.now().strftime("%Y-%m-%d")
-    
-    # 2. Get Details
-    description = input("Description (e.g., Nasi Lemak, Fuel): ")
-    category = input("Category (e.g., Food, Transport, Utilities): ")
-    
-    # 3. Get Amount (Ensure it's a number)
+    return date_input
+
+def ask_amount(prompt="Amount: "):
+    # Ensure it's a number
     while True:
         try:
-            amount = float(input("Amount: "))
-            break
+            return float(input(prompt))
         except ValueError:
             print("Please enter a valid number for the amount.")
 
+def add_expense():
+    print("\n--- 💸 Add New Expense ---")
+
+    # 1. Get Date
+    date_input = ask_date()
+
+    # 2. Get Details
+    description = input("Description (e.g., Nasi Lemak, Fuel): ")
+    category = input("Category (e.g., Food, Transport, Utilities): ")
+
+    # 3. Get Amount
+    amount = ask_amount()
+
     # Prepare data based on columns: [Date, Description, Category, Amount]
     row_data = [date_input, description, category, amount]
     save_to_excel('Expenses', row_data)
 
+def add_income():
+    print("\n--- 📥 Add New Income ---")
+    date_input = ask_date()
+    source = input("Source (e.g., Salary, Freelance): ")
+    amount = ask_amount()
+    save_to_excel('Income', [date_input, source, amount])
+
+def add_savings():
+    print("\n--- 🐷 Add Savings ---")
+    date_input = ask_date()
+    description = input("Description (e.g., ASB, Emergency Fund): ")
+    amount = ask_amount()
+    save_to_excel('Savings', [date_input, description, amount])
+
+def set_budget():
+    print("\n--- 🎯 Set Monthly Budget ---")
+    for category, limit in get_store().rows('Budget_Plan'):
+        print(f"  {category}: RM {limit}")
+    category = input("Category (e.g., Food, Housing): ")
+    amount = ask_amount("Monthly limit: ")
+    try:
+        get_store().put('Budget_Plan', [category, amount])
+        print(f"✅ Budget for {category} set to RM {amount:.2f}!")
+    except Exception as e:
+        print(f"❌ Error saving data: {e}")
+
 def main():
     while True:
         print("\n" + "="*30)
         print("   PERSONAL BUDGET TRACKER")
         print("="*30)
         print("1. Add Expense")
-        print("2. Add Income (Coming soon)")
-        print("3. Exit")
-        
-        choice = input("\nSelect an option (1-3): ")
-        
+        print("2. Add Income")
+        print("3. Add Savings")
+        print("4. Set Budget")
+        print("5. Exit")
+
+        choice = input("\nSelect an option (1-5): ")
+
         if choice == '1':
             add_expense()
         elif choice == '2':
-            print("We will build this in the next step!")
+            add_income()
         elif choice == '3':
+            add_savings()
+        elif choice == '4':
+            set_budget()
+        elif choice == '5':
+            if store is not None: store.close()
             print("Exiting system. Goodbye!")
             break
         else:
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# --- RECEIPT OCR ---
+# easyocr takes seconds to import and load its model, so nothing happens at
+# import time. Scans run in a small pool of worker processes, each of which
+# loads the model once; the Streamlit threads only submit jobs and poll the
+# returned futures. Results are cached by a hash of the image bytes, so a
+# re-upload (or the same receipt from two sessions) never runs OCR twice.
+#
+# Phone photos are 12+ MP, so images are shrunk and cleaned up before easyocr
+# sees them, and the bottom of the receipt (where the total usually is) is
+# tried first. benchmarks/ocr_preprocess.py compares this against RAW.
+
+OCR_AVAILABLE = all(importlib.util.find_spec(m) is not None for m in ("easyocr", "cv2"))
+OCR_WORKERS = int(os.environ.get("BUDGET_OCR_WORKERS", "2"))
+RESULT_CACHE_SIZE = 256
+
+PREPROCESS = {
+    "max_side": 1600,      # longest edge in px after downscaling (None = keep)
+    "deskew": True,        # straighten receipts photographed at an angle
+    "normalize": True,     # CLAHE contrast normalisation
+    "crop_bottom": 0.45,   # try the bottom 45% first (None = whole image only)
+}
+# The original path: full resolution, no clean-up, whole image
+RAW = {"max_side": None, "deskew": False, "normalize": False, "crop_bottom": None}
+
+_reader = None
+_lock = threading.Lock()
+
+
+def get_reader():
+    """The easyocr Reader for this process, created on first use."""
+    global _reader
+    with _lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(['en'], gpu=False)
+    return _reader
+
+
+def extract_total(texts):
+    """Largest money-looking number (e.g. 1,234.50) among the OCR'd lines."""
+    matches = re.findall(r"(\d{1,3}(?:,\d{3})*(?:\.\d{2}))", " ".join(texts))
+    return max((float(m.replace(',', '')) for m in matches), default=0.0)
+
+
+def _deskew(img):
+    import cv2
+    _, ink = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(ink)
+    if coords is None: return img
+    # minAreaRect reports angles in [0, 90) or [-90, 0) depending on the OpenCV
+    # version; fold both into (-45, 45]
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle > 45: angle -= 90
+    elif angle <= -45: angle += 90
+    # Tiny angles aren't worth a resample; big ones are probably a misread
+    if abs(angle) < 0.5 or abs(angle) > 15: return img
+    h, w = img.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(img, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def preprocess(img, max_side=None, deskew=False, normalize=False, **_):
+    """Downscale, straighten and contrast-normalise a grayscale image."""
+    import cv2
+    if max_side and max(img.shape) > max_side:
+        scale = max_side / max(img.shape)
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if deskew: img = _deskew(img)
+    if normalize: img = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(img)
+    return img
+
+
+def scan_image(image_bytes, options=None):
+    import cv2
+    opts = {**PREPROCESS, **(options or {})}
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    img = preprocess(img, **opts)
+    reader = get_reader()
+    if opts["crop_bottom"]:
+        bottom = img[int(img.shape[0] * (1 - opts["crop_bottom"])):]
+        total = extract_total(reader.readtext(bottom, detail=0))
+        if total > 0: return total
+    return extract_total(reader.readtext(img, detail=0))
+
+
+def image_key(image_bytes, options=None):
+    return hashlib.sha256(image_bytes + repr(sorted((options or {}).items())).encode()).hexdigest()
+
+
+def _init_worker():
+    # Don't let a model load failure break the whole pool; the scan will report it
+    try: get_reader()
+    except Exception: pass
+
+
+def _ping():
+    return _reader is not None
+
+
+class OCRService:
+    def __init__(self, workers=OCR_WORKERS, cache_size=RESULT_CACHE_SIZE, options=None):
+        self.options = options or {}   # overrides for PREPROCESS
+        self.workers = workers
+        self.cache_size = cache_size
+        self.results = OrderedDict()   # image hash -> total, least recently used first
+        self.jobs = {}                 # image hash -> Future still running
+        self.lock = threading.Lock()
+        self.warmup = []
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        # spawn, not fork: the Streamlit process is full of threads
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   mp_context=multiprocessing.get_context("spawn"))
+
+    def warm_up(self):
+        """Start every worker (each loads the model in its initializer). Only the first call does anything."""
+        with self.lock:
+            if not self.warmup:
+                self.warmup = [self.pool.submit(_ping) for _ in range(self.workers)]
+
+    def status(self):
+        if not self.warmup: return "not loaded"
+        if not all(f.done() for f in self.warmup): return "loading"
+        return "ready" if all(f.exception() is None and f.result() for f in self.warmup) else "failed"
+
+    def submit(self, image_bytes):
+        """Future resolving to the receipt total. Cached and in-flight scans are shared."""
+        key = image_key(image_bytes, self.options)
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                done = Future()
+                done.set_result(self.results[key])
+                return done
+            if key in self.jobs: return self.jobs[key]
+            try:
+                job = self.pool.submit(scan_image, image_bytes, self.options)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); its jobs have already
+                # failed, so start a fresh pool and warm it up again
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._new_pool()
+                self.jobs = {}
+                self.warmup = [self.pool.submit(_ping) for _ in range(self.workers)]
+                job = self.pool.submit(scan_image, image_bytes, self.options)
+            self.jobs[key] = job
+        job.add_done_callback(lambda f: self._finished(key, f))
+        return job
+
+    def _finished(self, key, job):
+        with self.lock:
+            self.jobs.pop(key, None)
+            if job.cancelled() or job.exception() is not None: return   # don't cache failures
+            self.results[key] = job.result()
+            while len(self.results) > self.cache_size: self.results.popitem(last=False)
@@ -0,0 +1,163 @@
+import contextvars
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+# --- INSTRUMENTATION ---
+# Off by default. When enabled (BUDGET_PERF=1 or perf = true in secrets), each
+# rerun collects timings for the named sections (load_data, OCR, rollups,
+# export, ...) and every HTTP request gspread makes, logs them as one JSON
+# line on the "budget.perf" logger and shows them in the sidebar panel.
+# Sheets requests are also counted process-wide over the last minute, since
+# every session shares one service account's quota.
+#
+# Disabled, timer() hands back a shared no-op context manager, timed() returns
+# the function unchanged and gspread isn't patched, so the cost is one
+# attribute check per call site.
+
+QUOTA_PER_MIN = 300   # Sheets API read / write requests per minute per project
+
+log = logging.getLogger("budget.perf")
+enabled = False
+_run = contextvars.ContextVar("perf_run", default=None)
+_calls = deque()          # timestamps of Sheets requests, process-wide
+_calls_lock = threading.Lock()
+_NULL = nullcontext()
+
+
+class Run:
+    """Timings and Sheets calls for one rerun (or one background job)."""
+
+    def __init__(self, label):
+        self.label = label
+        self.start = time.perf_counter()
+        self.timings = defaultdict(lambda: [0.0, 0])   # name -> [total ms, count]
+        self.api = defaultdict(lambda: [0.0, 0])       # request kind -> [total ms, count]
+        self.total_ms = None
+
+    def add(self, table, name, ms):
+        entry = table[name]
+        entry[0] += ms
+        entry[1] += 1
+
+    def summary(self):
+        return {
+            "run": self.label,
+            "total_ms": round(self.total_ms if self.total_ms is not None else (time.perf_counter() - self.start) * 1000, 1),
+            "timings": {k: {"ms": round(v[0], 1), "n": v[1]} for k, v in self.timings.items()},
+            "sheets_calls": {k: {"ms": round(v[0], 1), "n": v[1]} for k, v in self.api.items()},
+            "sheets_calls_last_min": calls_last_minute(),
+        }
+
+
+def configure(on):
+    global enabled
+    on = str(on).lower() in ("1", "true", "yes", "on")
+    if on and not enabled: _patch_gspread()
+    if on and not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+    enabled = on
+
+
+# --- RUNS ---
+def start_run(label):
+    if not enabled: return None
+    run = Run(label)
+    _run.set(run)
+    return run
+
+
+def end_run():
+    """Finish the current run and log it. Returns the Run (None when disabled)."""
+    run = _run.get()
+    if run is None: return None
+    run.total_ms = (time.perf_counter() - run.start) * 1000
+    _run.set(None)
+    log.info(json.dumps(run.summary()))
+    return run
+
+
+def record(name, ms):
+    """Add an already-measured duration (e.g. an OCR job) to the current run, or log it."""
+    if not enabled: return
+    run = _run.get()
+    if run is not None: run.add(run.timings, name, ms)
+    else: log.info(json.dumps({"event": name, "ms": round(ms, 1)}))
+
+
+# --- TIMERS ---
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def timer(name):
+    return _timer(name) if enabled else _NULL
+
+
+def timed(name):
+    """Decorator form of timer(). Decided when the function is defined."""
+    def wrap(fn):
+        if not enabled: return fn
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with _timer(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# --- SHEETS API CALLS ---
+def calls_last_minute():
+    now = time.time()
+    with _calls_lock:
+        while _calls and now - _calls[0] > 60: _calls.popleft()
+        return len(_calls)
+
+
+def request_kind(method, endpoint):
+    """'GET values', 'POST values:append', 'POST :batchUpdate', 'GET metadata', 'GET drive/files', ..."""
+    if "googleapis.com/drive" in endpoint: return f"{method} drive/files"
+    tail = re.sub(r"^.*?/spreadsheets/[^/:]+", "", endpoint.split("?")[0])
+    verb = re.search(r":(append|clear|batchUpdate|batchGet|batchClear)$", tail)
+    kind = tail.lstrip("/").split("/")[0].split(":")[0] or ("" if verb else "metadata")
+    return f"{method} {kind}{':' + verb.group(1) if verb else ''}"
+
+
+def _patch_gspread():
+    from gspread.http_client import HTTPClient
+    if getattr(HTTPClient.request, "_perf", False): return
+    original = HTTPClient.request
+
+    @functools.wraps(original)
+    def request(self, method, endpoint, *args, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return original(self, method, endpoint, *args, **kwargs)
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", type(e).__name__)
+            raise
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            kind = request_kind(method.upper(), endpoint)
+            with _calls_lock: _calls.append(time.time())
+            run = _run.get()
+            if run is not None: run.add(run.api, kind, ms)
+            if status != "ok" or run is None:
+                log.info(json.dumps({"event": "sheets_call", "kind": kind, "ms": round(ms, 1), "status": status}))
+
+    request._perf = True
+    HTTPClient.request = request
@@ -0,0 +1,85 @@
+import csv
+import io
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+# --- REPORT EXPORT ---
+# Built only when a download button is clicked. Rows are streamed into a
+# write-only workbook (or CSV) that spools to disk once it gets big, instead of
+# going through pd.ExcelWriter, so an annual report doesn't hold the whole
+# workbook as cell objects. Summary sheets come from the rollups, not the rows.
+
+SPOOL_BYTES = 4 * 1024 * 1024
+TREND_MONTHS = 12
+
+FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+
+def _rows(df, cols):
+    """Plain Python rows (Timestamps as dates, NaN as blank) without copying the frame."""
+    for row in df[cols].itertuples(index=False, name=None):
+        yield [None if pd.isna(v) else v.date() if isinstance(v, pd.Timestamp) else v for v in row]
+
+
+def category_totals(rollups, period):
+    rows = [["Expenses", cat, amt] for cat, amt in rollups.breakdown("Expenses", period).sort_values(ascending=False).items()]
+    rows += [["Income", src, amt] for src, amt in rollups.breakdown("Income", period).sort_values(ascending=False).items()]
+    return rows
+
+
+def monthly_trend(rollups, period):
+    """Income / expenses / balance per month: the months of a year, or the
+    TREND_MONTHS months up to and including a month."""
+    months = sorted(rollups.periods(monthly=True))
+    if len(period) == 4:
+        months = [m for m in months if m.startswith(period)]
+    else:
+        months = [m for m in months if m <= period][-TREND_MONTHS:]
+    out = []
+    for m in months:
+        ti, te = rollups.total("Income", m), rollups.total("Expenses", m)
+        out.append([m, round(ti, 2), round(te, 2), round(ti - te, 2)])
+    return out
+
+
+def _spooled(write):
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as f:
+        write(f)
+        f.seek(0)
+        return f.read()
+
+
+def build_xlsx(f_e, f_i, rollups, period):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Summary")
+    ws.append(["Type", "Category / Source", "Amount"])
+    for row in category_totals(rollups, period): ws.append(row)
+    ws = wb.create_sheet("Monthly Trend")
+    ws.append(["Month", "Income", "Expenses", "Balance"])
+    for row in monthly_trend(rollups, period): ws.append(row)
+    for tab, df, cols in (("Expenses", f_e, ["Date", "Description", "Category", "Amount"]),
+                          ("Income", f_i, ["Date", "Source", "Amount"])):
+        ws = wb.create_sheet(tab)
+        ws.append(cols)
+        for row in _rows(df, cols): ws.append(row)
+    return _spooled(wb.save)
+
+
+def build_csv(f_e, f_i):
+    """Both tabs in one flat file: Type, Date, Description, Category, Amount."""
+    def write(f):
+        text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        out = csv.writer(text)
+        out.writerow(["Type", "Date", "Description", "Category", "Amount"])
+        for d, desc, cat, amt in _rows(f_e, ["Date", "Description", "Category", "Amount"]):
+            out.writerow(["Expense", d, desc, cat, amt])
+        for d, src, amt in _rows(f_i, ["Date", "Source", "Amount"]):
+            out.writerow(["Income", d, src, "", amt])
+        text.flush()
+        text.detach()
+    return _spooled(write)
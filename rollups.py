@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+import pandas as pd
+
+from ledger import LABEL
+from storage import COLUMNS
+
+# --- PERIOD ROLLUPS ---
+# Totals per month ("2024-05") and per year ("2024") for every expense
+# category and income source. Built once from the loaded frames with a single
+# groupby, then kept up to date row by row as the app saves / edits / deletes,
+# so Analytics never has to re-scan the full history.
+
+
+def _period_keys(date):
+    return date.strftime('%Y-%m'), date.strftime('%Y')
+
+
+def _parse(tab, row):
+    rec = dict(zip(COLUMNS[tab], row))
+    date = pd.to_datetime(rec['Date'], errors='coerce')
+    if pd.isna(date): return None
+    amount = pd.to_numeric(str(rec['Amount']).replace(',', ''), errors='coerce')
+    cents = 0 if pd.isna(amount) else round(float(amount) * 100)
+    return date, str(rec[LABEL[tab]]), cents
+
+
+class Rollups:
+    def __init__(self):
+        # tab -> period -> label -> cents (ints, so edits add up exactly), and tab -> period -> row count
+        self.totals = {tab: defaultdict(lambda: defaultdict(int)) for tab in COLUMNS}
+        self.counts = {tab: defaultdict(int) for tab in COLUMNS}
+        self.versions = None
+
+    @classmethod
+    def build(cls, led_e, led_i):
+        """From the Expenses and Income Ledgers (see ledger.py)."""
+        r = cls()
+        for led in (led_e, led_i):
+            tab, df = led.tab, led.dated()
+            if df.empty: continue
+            labels = df[LABEL[tab]]
+            for freq in ('M', 'Y'):
+                # str(Period) is '2024-05' / '2024', the same keys _period_keys makes
+                periods = df['Date'].dt.to_period(freq)
+                sums = df['Cents'].groupby([periods, labels], observed=True).sum()
+                for (period, label), cents in sums.items():
+                    r.totals[tab][str(period)][str(label)] = int(cents)
+                for period, n in periods.value_counts().items():
+                    r.counts[tab][str(period)] = int(n)
+        return r
+
+    # --- INCREMENTAL UPDATES ---
+    def add(self, tab, row):
+        self._apply(tab, row, 1)
+
+    def remove(self, tab, row):
+        self._apply(tab, row, -1)
+
+    def _apply(self, tab, row, sign):
+        parsed = _parse(tab, row)
+        if parsed is None: return
+        date, label, cents = parsed
+        for period in _period_keys(date):
+            totals = self.totals[tab][period]
+            totals[label] += sign * cents
+            self.counts[tab][period] += sign
+            if self.counts[tab][period] <= 0:
+                del self.counts[tab][period]
+                del self.totals[tab][period]
+
+    # --- QUERIES ---
+    def periods(self, monthly=True):
+        """Periods that have any income or expense, newest first."""
+        keys = set(self.counts["Expenses"]) | set(self.counts["Income"])
+        return sorted((k for k in keys if (len(k) == 7) == monthly), reverse=True)
+
+    def breakdown(self, tab, period):
+        """Amount per category (or income source) for one period."""
+        totals = self.totals[tab].get(period, {})
+        return pd.Series({k: v / 100 for k, v in totals.items() if v}, dtype=float).rename_axis(LABEL[tab]).rename("Amount")
+
+    def total(self, tab, period):
+        return sum(self.totals[tab].get(period, {}).values()) / 100
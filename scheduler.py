@@ -0,0 +1,151 @@
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import gspread
+from gspread.http_client import HTTPClient
+
+# --- SHEETS REQUEST SCHEDULER ---
+# Every session shares one service account, so its per-minute quota is shared
+# too. All gspread HTTP requests go through one Scheduler per account:
+#   * a token bucket keeps the process under RATE_PER_MIN (a 429 empties it)
+#   * when requests queue for tokens, interactive ones (a user waiting on a
+#     rerun) go before background ones (the write queue)
+#   * 429 / 5xx responses to reads are retried with jittered exponential
+#     backoff; writes only on 429 (Sheets rejected it, nothing was applied).
+#     A 5xx may come after a write went through, so the write queue re-checks
+#     the sheet and resends what's missing instead of replaying the request
+#   * identical GETs already in flight (two reruns loading the same tab) wait
+#     for that one response instead of sending another request
+# The client opts in with gspread.authorize(creds, http_client=ScheduledHTTPClient).
+
+RATE_PER_MIN = 240     # a little under Google's 300 / min so other tools still fit
+BURST = 20
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 32.0
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
+INTERACTIVE, BACKGROUND = 0, 1
+_priority = contextvars.ContextVar("sheets_priority", default=INTERACTIVE)
+
+
+def backoff(attempt):
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+@contextmanager
+def background():
+    """Requests made inside this block yield to interactive ones."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class Scheduler:
+    def __init__(self, rate_per_min=RATE_PER_MIN, burst=BURST):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = []                  # heap of (priority, ticket)
+        self.tickets = itertools.count()
+        self.in_flight = {}                # read key -> Future
+        self.cond = threading.Condition()
+
+    # --- TOKEN BUCKET ---
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _acquire(self, priority):
+        with self.cond:
+            entry = (priority, next(self.tickets))
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    self._refill()
+                    if self.waiting[0] == entry and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    self.cond.wait(max((1 - self.tokens) / self.rate, 0.01))
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+
+    def _throttled(self):
+        # Google says we're over quota: stop everyone until the bucket refills
+        with self.cond:
+            self.tokens = min(self.tokens, 0.0)
+
+    # --- PUBLIC API ---
+    def run(self, send, key=None, idempotent=True):
+        """Call send() once a token is free, retrying 429 (and 5xx if `idempotent`).
+        Calls sharing a `key` while one is in flight get that call's result instead."""
+        if key is not None:
+            with self.cond:
+                shared = self.in_flight.get(key)
+                if shared is None:
+                    shared = self.in_flight[key] = Future()
+                    owner = True
+                else:
+                    owner = False
+            if not owner: return shared.result()
+            try:
+                result = self._send(send, idempotent)
+                shared.set_result(result)
+                return result
+            except BaseException as e:
+                shared.set_exception(e)
+                raise
+            finally:
+                with self.cond: self.in_flight.pop(key, None)
+        return self._send(send, idempotent)
+
+    def _send(self, send, idempotent):
+        priority = _priority.get()
+        for attempt in range(MAX_RETRIES):
+            self._acquire(priority)
+            try:
+                return send()
+            except gspread.exceptions.APIError as e:
+                status = e.response.status_code
+                retry = status == 429 or (idempotent and status in RETRY_STATUS)
+                if not retry or attempt == MAX_RETRIES - 1: raise
+                if status == 429: self._throttled()
+                time.sleep(backoff(attempt))
+
+
+_schedulers = {}
+_lock = threading.Lock()
+
+
+def get_scheduler(account):
+    with _lock:
+        if account not in _schedulers: _schedulers[account] = Scheduler()
+        return _schedulers[account]
+
+
+class ScheduledHTTPClient(HTTPClient):
+    """gspread HTTP client that sends everything through the account's Scheduler."""
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        account = getattr(auth, "service_account_email", None) or getattr(auth, "_service_account_email", None)
+        self.scheduler = get_scheduler(account or "default")
+
+    def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+        send = lambda: super(ScheduledHTTPClient, self).request(method, endpoint, params=params, data=data,
+                                                                 json=json, files=files, headers=headers)
+        read = method.lower() == "get" and data is None and json is None and files is None
+        key = (endpoint, repr(sorted((params or {}).items()))) if read else None
+        return self.scheduler.run(send, key=key, idempotent=read)
@@ -0,0 +1,381 @@
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+
+import gspread
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+# --- STORAGE BACKENDS ---
+# The app talks to one of these instead of calling gspread / openpyxl directly.
+# Every transaction carries a stable ID (last column). Backends return a
+# DataFrame indexed by that ID, and update() / delete() take it as the key, so
+# the UI never needs to know where a row physically lives.
+# update() and delete() return the previous row (a list in COLUMNS order) so
+# callers can keep derived totals in step without re-reading the tab.
+
+COLUMNS = {
+    "Expenses": ["Date", "Description", "Category", "Amount", "ID"],
+    "Income": ["Date", "Source", "Amount", "ID"],
+}
+
+CATEGORIES = ["Food", "Transport", "Utilities", "Shopping", "Housing", "Other"]
+
+# Monthly limit per category (same sheet as setup_storage.py). Not a ledger
+# tab: no IDs, and it's read once per session rather than synced.
+BUDGET_TAB = "Budget_Plan"
+BUDGET_COLUMNS = ["Category", "Budgeted_Amount"]
+HEADERS = {**COLUMNS, BUDGET_TAB: BUDGET_COLUMNS}
+
+
+def new_id():
+    return uuid.uuid4().hex[:12]
+
+
+def with_id(tab, row):
+    """Pad a data row (without ID) to the full width, generating an ID if needed."""
+    row = list(row) + [""] * (len(COLUMNS[tab]) - len(row))
+    if not row[-1]: row[-1] = new_id()
+    return row
+
+
+def budget_dict(rows):
+    """[category, amount] rows -> {category: amount}, skipping blanks and junk."""
+    limits = {}
+    for row in rows:
+        if not row or not row[0]: continue
+        amount = pd.to_numeric(str(row[1] if len(row) > 1 else "").replace(',', ''), errors='coerce')
+        if pd.notna(amount) and amount > 0: limits[str(row[0])] = float(amount)
+    return limits
+
+
+def empty_frame(tab):
+    return pd.DataFrame(columns=COLUMNS[tab][:-1], index=pd.Index([], dtype=object))
+
+
+class StorageBackend:
+    name = "base"
+
+    def __init__(self):
+        self._versions = defaultdict(int)
+
+    def versions(self):
+        """One counter per tab, bumped whenever its rows change."""
+        return tuple(self._versions[tab] for tab in COLUMNS)
+
+    def load(self, tab):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Pick up changes made outside this backend (bumping versions). Cheap; called every rerun."""
+
+    def append(self, tab, rows):
+        raise NotImplementedError
+
+    def update(self, tab, key, row):
+        raise NotImplementedError
+
+    def delete(self, tab, key):
+        raise NotImplementedError
+
+    def query(self, tab, start=None, end=None, category=None):
+        """Rows with start <= Date <= end (either may be None), optionally one category."""
+        df = self.load(tab)
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        mask = pd.Series(True, index=df.index)
+        if start is not None: mask &= dates >= pd.Timestamp(start)
+        if end is not None: mask &= dates <= pd.Timestamp(end)
+        if category is not None: mask &= df['Category'] == category
+        return df[mask]
+
+    def load_budget(self):
+        """{category: monthly limit}"""
+        return {}
+
+    def save_budget(self, limits):
+        raise NotImplementedError
+
+    # Writes are synchronous unless a backend says otherwise
+    def pending(self):
+        return 0
+
+    def pop_failed(self):
+        return []
+
+
+# --- GOOGLE SHEETS ---
+class SheetsBackend(StorageBackend):
+    """Reads from the local LedgerCache, writes through the WriteQueue.
+
+    The cache knows which sheet row each ID is on, so edits and deletes go
+    straight to that row; the queue double-checks it before writing.
+    """
+    name = "sheets"
+
+    def __init__(self, sheet_name, cache, queue, open_ws, open_or_create=None):
+        """`open_ws(sheet_name, tab)` returns the worksheet; `open_or_create` is the
+        same but adds a missing tab (with its header) instead of raising."""
+        super().__init__()
+        self.sheet_name = sheet_name
+        self.cache = cache
+        self.queue = queue
+        self.open_ws = open_ws
+        self.open_or_create = open_or_create or open_ws
+
+    def load(self, tab):
+        # Don't pull from Sheets while our own writes are still queued
+        sync = self.pending() == 0
+        return self.cache.load(tab, lambda: self.open_ws(self.sheet_name, tab), sync=sync)
+
+    def refresh(self):
+        sync = self.pending() == 0
+        for tab in COLUMNS:
+            try: self.cache.refresh(tab, lambda tab=tab: self.open_ws(self.sheet_name, tab), sync=sync)
+            except gspread.exceptions.WorksheetNotFound: pass
+
+    def append(self, tab, rows):
+        rows = [with_id(tab, row) for row in rows]
+        self.cache.append(tab, rows)
+        self.queue.append(self.sheet_name, tab, rows)
+
+    def update(self, tab, key, row):
+        row = with_id(tab, list(row)[:len(COLUMNS[tab]) - 1] + [key])
+        old, pos = self.cache.update(tab, key, row)
+        self.queue.update(self.sheet_name, tab, key, pos, row)
+        return old
+
+    def delete(self, tab, key):
+        old, pos = self.cache.delete(tab, key)
+        self.queue.delete(self.sheet_name, tab, key, pos)
+        return old
+
+    def versions(self):
+        return tuple(self.cache.versions[tab] for tab in COLUMNS)
+
+    def load_budget(self):
+        try: ws = self.open_ws(self.sheet_name, BUDGET_TAB)
+        except gspread.exceptions.WorksheetNotFound: return {}
+        return budget_dict(ws.get_all_values()[1:])
+
+    def save_budget(self, limits):
+        # Rare and tiny, so written straight away rather than through the queue.
+        # New values first, then clear the leftover rows below them, so a
+        # failed request never leaves the sheet without a budget.
+        ws = self.open_or_create(self.sheet_name, BUDGET_TAB)
+        ws.update(range_name="A1", values=[BUDGET_COLUMNS] + [[c, a] for c, a in limits.items()])
+        ws.batch_clear([f"A{len(limits) + 2}:B"])
+
+    def pending(self):
+        return self.queue.pending(self.sheet_name)
+
+    def pop_failed(self):
+        return self.queue.pop_failed(self.sheet_name)
+
+
+# --- EXCEL WORKBOOK (same file as main.py / setup_storage.py) ---
+class ExcelBackend(StorageBackend):
+    """Rows without an ID (e.g. added by main.py) get one the next time they're loaded.
+
+    Saves by anything else (main.py, Excel itself) are noticed by the file's
+    modification time and bump every version.
+    """
+    name = "excel"
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+        self.mtime = self._mtime()
+
+    def _mtime(self):
+        return os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+    def _save(self, wb):
+        wb.save(self.path)
+        self.mtime = self._mtime()
+
+    def refresh(self):
+        with self.lock:
+            mtime = self._mtime()
+            if mtime != self.mtime:
+                self.mtime = mtime
+                for tab in COLUMNS: self._versions[tab] += 1
+
+    def _open(self):
+        if os.path.exists(self.path): return load_workbook(self.path)
+        wb = Workbook()
+        wb.remove(wb.active)
+        return wb
+
+    def _sheet(self, wb, tab):
+        if tab not in wb.sheetnames:
+            wb.create_sheet(tab).append(COLUMNS[tab])
+        ws = wb[tab]
+        if ws.cell(row=1, column=len(COLUMNS[tab])).value != "ID":
+            ws.cell(row=1, column=len(COLUMNS[tab]), value="ID")
+        return ws
+
+    def _find(self, ws, key):
+        id_col = len(COLUMNS[ws.title])
+        for r, (value,) in enumerate(ws.iter_rows(min_row=2, min_col=id_col, max_col=id_col, values_only=True), start=2):
+            if value == key: return r
+        raise KeyError(key)
+
+    def _backfill_ids(self, tab):
+        with self.lock:
+            wb = self._open()
+            ws = self._sheet(wb, tab)
+            id_col = len(COLUMNS[tab])
+            for r in range(2, ws.max_row + 1):
+                if not ws.cell(row=r, column=id_col).value:
+                    ws.cell(row=r, column=id_col, value=new_id())
+            self._save(wb)
+
+    def load(self, tab):
+        if not os.path.exists(self.path): return empty_frame(tab)
+        with self.lock:
+            wb = load_workbook(self.path, read_only=True)
+            try:
+                if tab not in wb.sheetnames: return empty_frame(tab)
+                rows = list(wb[tab].iter_rows(values_only=True))
+            finally:
+                wb.close()
+        if not rows: return empty_frame(tab)
+        df = pd.DataFrame(rows[1:], columns=list(rows[0])).reindex(columns=COLUMNS[tab])
+        if df['ID'].isna().any() or (df['ID'] == "").any():
+            self._backfill_ids(tab)
+            return self.load(tab)
+        return df.set_index('ID').rename_axis(None)
+
+    def append(self, tab, rows):
+        with self.lock:
+            wb = self._open()
+            ws = self._sheet(wb, tab)
+            for row in rows: ws.append(with_id(tab, row))
+            self._save(wb)
+            self._versions[tab] += 1
+
+    def _row(self, ws, r):
+        return [c.value for c in ws[r][:len(COLUMNS[ws.title])]]
+
+    def load_budget(self):
+        if not os.path.exists(self.path): return {}
+        with self.lock:
+            wb = load_workbook(self.path, read_only=True)
+            try: rows = list(wb[BUDGET_TAB].iter_rows(min_row=2, values_only=True)) if BUDGET_TAB in wb.sheetnames else []
+            finally: wb.close()
+        return budget_dict(rows)
+
+    def save_budget(self, limits):
+        with self.lock:
+            wb = self._open()
+            if BUDGET_TAB in wb.sheetnames: wb.remove(wb[BUDGET_TAB])
+            ws = wb.create_sheet(BUDGET_TAB)
+            ws.append(BUDGET_COLUMNS)
+            for row in limits.items(): ws.append(list(row))
+            self._save(wb)
+
+    def update(self, tab, key, row):
+        with self.lock:
+            wb = self._open()
+            ws = self._sheet(wb, tab)
+            r = self._find(ws, key)
+            old = self._row(ws, r)
+            for col, value in enumerate(with_id(tab, list(row)[:len(COLUMNS[tab]) - 1] + [key]), start=1):
+                ws.cell(row=r, column=col, value=value)
+            self._save(wb)
+            self._versions[tab] += 1
+        return old
+
+    def delete(self, tab, key):
+        with self.lock:
+            wb = self._open()
+            ws = self._sheet(wb, tab)
+            r = self._find(ws, key)
+            old = self._row(ws, r)
+            ws.delete_rows(r)
+            self._save(wb)
+            self._versions[tab] += 1
+        return old
+
+
+# --- SQLITE ---
+class SQLiteBackend(StorageBackend):
+    """Local database with Date, Category and ID indexes."""
+    name = "sqlite"
+
+    def __init__(self, path):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            for tab, cols in COLUMNS.items():
+                col_sql = ", ".join(f'"{c}" REAL' if c == "Amount" else f'"{c}" TEXT' for c in cols)
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{tab}" (seq INTEGER PRIMARY KEY AUTOINCREMENT, {col_sql})')
+                self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{tab}_id" ON "{tab}" (ID)')
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{tab}_date" ON "{tab}" (Date)')
+                if "Category" in cols:
+                    self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{tab}_category" ON "{tab}" (Category, Date)')
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{BUDGET_TAB}" (Category TEXT PRIMARY KEY, Budgeted_Amount REAL)')
+
+    def _select(self, tab, where="", params=()):
+        col_sql = ", ".join(f'"{c}"' for c in COLUMNS[tab])
+        with self.lock:
+            df = pd.read_sql_query(f'SELECT {col_sql} FROM "{tab}" {where} ORDER BY seq', self.conn,
+                                   params=params, index_col='ID')
+        df.index.name = None
+        return df
+
+    def load(self, tab):
+        return self._select(tab)
+
+    def query(self, tab, start=None, end=None, category=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("Date >= ?"); params.append(str(pd.Timestamp(start).date()))
+        if end is not None:
+            clauses.append("Date <= ?"); params.append(str(pd.Timestamp(end).date()))
+        if category is not None:
+            clauses.append("Category = ?"); params.append(category)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(tab, where, params)
+
+    def append(self, tab, rows):
+        cols = COLUMNS[tab]
+        col_sql = ", ".join(f'"{c}"' for c in cols)
+        marks = ", ".join("?" * len(cols))
+        with self.lock, self.conn:
+            self.conn.executemany(f'INSERT INTO "{tab}" ({col_sql}) VALUES ({marks})', [with_id(tab, r) for r in rows])
+            self._versions[tab] += 1
+
+    def _row(self, tab, key):
+        col_sql = ", ".join(f'"{c}"' for c in COLUMNS[tab])
+        row = self.conn.execute(f'SELECT {col_sql} FROM "{tab}" WHERE ID = ?', (key,)).fetchone()
+        return list(row) if row else None
+
+    def update(self, tab, key, row):
+        cols = COLUMNS[tab][:-1]
+        set_sql = ", ".join(f'"{c}" = ?' for c in cols)
+        with self.lock, self.conn:
+            old = self._row(tab, key)
+            self.conn.execute(f'UPDATE "{tab}" SET {set_sql} WHERE ID = ?', (*list(row)[:len(cols)], key))
+            self._versions[tab] += 1
+        return old
+
+    def delete(self, tab, key):
+        with self.lock, self.conn:
+            old = self._row(tab, key)
+            self.conn.execute(f'DELETE FROM "{tab}" WHERE ID = ?', (key,))
+            self._versions[tab] += 1
+        return old
+
+    def load_budget(self):
+        with self.lock:
+            return budget_dict(self.conn.execute(f'SELECT Category, Budgeted_Amount FROM "{BUDGET_TAB}"').fetchall())
+
+    def save_budget(self, limits):
+        with self.lock, self.conn:
+            self.conn.execute(f'DELETE FROM "{BUDGET_TAB}"')
+            self.conn.executemany(f'INSERT INTO "{BUDGET_TAB}" VALUES (?, ?)', list(limits.items()))
@@ -0,0 +1,48 @@
+"""Receipt preprocessing on synthetic images (needs opencv).
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+cv2 = pytest.importorskip("cv2")
+
+import ocr  # noqa: E402
+
+
+def receipt():
+    """White page with lines of 'text': a block much wider than it is tall."""
+    img = np.full((400, 600), 255, dtype=np.uint8)
+    for y in range(120, 280, 20): cv2.rectangle(img, (100, y), (500, y + 8), 0, -1)
+    return img
+
+
+def rotate(img, angle):
+    h, w = img.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(img, m, (w, h), borderValue=255)
+
+
+def tilt(img):
+    """Angle (degrees) of the ink's long axis from horizontal."""
+    ys, xs = np.nonzero(img < 128)
+    cov = np.cov(np.vstack([xs, ys]))
+    vx, vy = np.linalg.eigh(cov)[1][:, -1]
+    return np.degrees(np.arctan(vy / vx))
+
+
+@pytest.mark.parametrize("angle", [-8, -3, 3, 8])
+def test_deskew_levels_receipts_tilted_either_way(angle):
+    tilted = rotate(receipt(), angle)
+    assert abs(tilt(tilted)) > 2
+    assert abs(tilt(ocr._deskew(tilted))) < 0.5
+
+
+def test_deskew_leaves_level_receipts_alone():
+    img = receipt()
+    assert ocr._deskew(img) is img
@@ -0,0 +1,107 @@
+"""RowIndex, the write queue's row lookups and the local cache, against the
+in-memory fake of gspread in benchmarks/fake_sheets.py.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import fake_sheets  # noqa: E402
+from local_cache import LedgerCache, RowIndex  # noqa: E402
+from storage import COLUMNS  # noqa: E402
+from write_queue import WriteQueue, _unshift  # noqa: E402
+
+HEADER = COLUMNS["Income"]   # Date, Source, Amount, ID
+
+
+@pytest.fixture
+def ws():
+    client = fake_sheets.FakeClient()
+    sheet = client.create("test", {"Income": [HEADER] + [["2024-01-0%d" % i, f"s{i}", str(i), f"id{i}"] for i in range(1, 6)]})
+    return sheet.worksheet("Income")
+
+
+@pytest.fixture
+def queue(ws):
+    q = WriteQueue(lambda sheet, tab: ws, width=lambda tab: len(COLUMNS[tab]), flush_interval=0.05)
+    yield q
+    q.flush()
+
+
+def calls_during(fn):
+    before = dict(fake_sheets.calls)
+    result = fn()
+    return result, {k: v - before.get(k, 0) for k, v in fake_sheets.calls.items() if v - before.get(k, 0)}
+
+
+# --- ROW INDEX ---
+def test_row_index_positions_shift_after_deletes():
+    index = RowIndex(["a", "b", "c", "d"])
+    index.remove("b")
+    assert [index.pos(i) for i in "acd"] == [0, 1, 2]
+    index.add("e")
+    index.remove("a")
+    assert [index.pos(i) for i in "cde"] == [0, 1, 2]
+    assert index.pos("b") is None
+
+
+# --- DELETE POSITIONS ---
+def test_unshift_maps_back_to_original_positions():
+    # Delete sheet positions 2, then 2 again (was 3), then 0: originally 2, 3, 0
+    assert _unshift([2, 2, 0]) == [2, 3, 0]
+    assert _unshift([0, 0, 0]) == [0, 1, 2]
+    assert _unshift([3, None, 1]) == [3, None, 1]
+
+
+# --- LOCATE ---
+def test_locate_trusts_correct_positions(queue, ws):
+    rows, calls = calls_during(lambda: queue._locate(ws, "Income", ["id2", "id5"], [1, 4]))
+    assert rows == [3, 6]
+    assert calls == {"batch_get": 1}
+
+
+def test_locate_finds_moved_rows(queue, ws):
+    del ws.rows[1]   # someone else deleted id1 in the sheet
+    rows, calls = calls_during(lambda: queue._locate(ws, "Income", ["id2", "id5"], [1, 4]))
+    assert rows == [2, 5]
+    assert calls == {"batch_get": 1, "col_values": 1}
+
+
+def test_locate_reports_missing_rows(queue, ws):
+    assert queue._locate(ws, "Income", ["id3", "gone", "id4"], [2, 0, None]) == [4, None, 5]
+
+
+# --- CACHE AND QUEUE AGREE ON COLUMNS ---
+def test_cache_reads_by_position_and_backfills_id_column(tmp_path, ws):
+    ws.rows = [["Date", "Source", "Amount"], ["2024-02-01", "a", "1"], ["2024-02-02", "b", "2", "kept"]]
+    cache = LedgerCache("test", cache_dir=str(tmp_path))
+    df = cache.load("Income", lambda: ws)
+    assert list(df["Source"]) == ["a", "b"]
+    assert ws.rows[0][3] == "ID" and ws.rows[2][3] == "kept"
+    assert list(df.index) == [r[3] for r in ws.rows[1:]]
+
+
+def test_queued_edits_land_on_the_cached_rows(tmp_path, ws, queue):
+    cache = LedgerCache("test", cache_dir=str(tmp_path))
+    cache.load("Income", lambda: ws)
+    row = ["2024-01-03", "edited", "30", "id3"]
+    _, pos = cache.update("Income", "id3", row)
+    queue.update("test", "Income", "id3", pos, row)
+    _, pos = cache.delete("Income", "id1")
+    queue.delete("test", "Income", "id1", pos)
+    queue.flush()
+    assert [r[3] for r in ws.rows[1:]] == ["id2", "id3", "id4", "id5"]
+    assert ws.rows[2] == row
+    assert list(cache.load("Income", lambda: ws, sync=False).index) == ["id2", "id3", "id4", "id5"]
+
+
+def test_cache_files_differ_for_names_that_sanitize_alike(tmp_path):
+    a = LedgerCache("Ali's Budget", cache_dir=str(tmp_path))
+    b = LedgerCache("Ali_s Budget", cache_dir=str(tmp_path))
+    assert a.path != b.path
+    assert LedgerCache("Ali's Budget", cache_dir=str(tmp_path)).path == a.path
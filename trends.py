@@ -0,0 +1,80 @@
+import calendar
+
+import pandas as pd
+
+# --- TRENDS ---
+# Month-by-month series across all years, built with one groupby per tab on
+# the Ledger's date-sorted frame (see ledger.py). Rolling averages, month-over-month deltas
+# and the end-of-month projection are whole-column operations on the result,
+# so nothing loops over months or re-masks the rows.
+# benchmarks/bench_trends.py times this on 100k transactions.
+
+ROLLING_MONTHS = 3
+
+
+def by_date(led):
+    """A Ledger's dated rows, indexed by date (already sorted)."""
+    return led.dated().set_index('Date')
+
+
+def monthly(df, label):
+    """Month x label matrix of summed amounts (RM), with empty months filled in as 0."""
+    if df.empty: return pd.DataFrame(index=pd.DatetimeIndex([], freq='MS'))
+    cents = df.groupby([pd.Grouper(freq='MS'), label], observed=True)['Cents'].sum().unstack(fill_value=0)
+    cents.columns = cents.columns.astype(str)
+    return cents.asfreq('MS', fill_value=0) / 100
+
+
+def compute(led_e, led_i, window=ROLLING_MONTHS):
+    """Everything the Trends view draws.
+
+    categories: month x category expenses      rolling: its rolling mean
+    totals:     Income / Expenses / Balance per month, plus the rolling mean
+                and month-over-month change of Expenses
+    """
+    cats = monthly(by_date(led_e), 'Category')
+    income = monthly(by_date(led_i), 'Source').sum(axis=1)
+    expenses = cats.sum(axis=1)
+    totals = pd.concat({"Income": income, "Expenses": expenses}, axis=1).fillna(0.0)
+    if not totals.empty: totals = totals.asfreq('MS', fill_value=0.0)
+    totals["Balance"] = totals["Income"] - totals["Expenses"]
+    totals["Expenses_Avg"] = totals["Expenses"].rolling(window, min_periods=1).mean()
+    totals["Expenses_MoM"] = totals["Expenses"].diff()
+    return {
+        "categories": cats,
+        "rolling": cats.rolling(window, min_periods=1).mean(),
+        "totals": totals,
+    }
+
+
+def month_over_month(cats, month):
+    """Per category: this month, the month before, and the change."""
+    month = pd.Timestamp(month).to_period('M').to_timestamp()
+    prev = month - pd.DateOffset(months=1)
+    this = cats.loc[month] if month in cats.index else pd.Series(0.0, index=cats.columns)
+    last = cats.loc[prev] if prev in cats.index else pd.Series(0.0, index=cats.columns)
+    out = pd.DataFrame({"This Month": this, "Last Month": last})
+    out["Change"] = out["This Month"] - out["Last Month"]
+    out["Change %"] = (out["Change"] / out["Last Month"].where(out["Last Month"] != 0)) * 100
+    return out[(out["This Month"] != 0) | (out["Last Month"] != 0)].sort_values("This Month", ascending=False)
+
+
+def last_month(totals, month, window=ROLLING_MONTHS):
+    """Expenses of the month before `month`, and their rolling mean over the
+    `window` months up to it (None if there's no earlier data). Months with no
+    rows count as 0, even past the end of `totals`."""
+    prev = pd.Timestamp(month).to_period('M').to_timestamp() - pd.DateOffset(months=1)
+    if totals.empty or totals.index[0] > prev: return 0.0, None
+    months = pd.date_range(end=prev, periods=window, freq='MS')
+    spent = totals["Expenses"].reindex(months[months >= totals.index[0]], fill_value=0.0)
+    return float(spent.iloc[-1]), float(spent.mean())
+
+
+def project_month(cats, today):
+    """Month-to-date spend per category and a straight-line projection to month end."""
+    today = pd.Timestamp(today)
+    month = today.to_period('M').to_timestamp()
+    days = calendar.monthrange(today.year, today.month)[1]
+    so_far = cats.loc[month] if month in cats.index else pd.Series(0.0, index=cats.columns)
+    out = pd.DataFrame({"So Far": so_far, "Projected": so_far * days / today.day})
+    return out[out["So Far"] != 0].sort_values("Projected", ascending=False)
@@ -0,0 +1,78 @@
+import hashlib
+import hmac
+import threading
+import time
+
+# --- USER DIRECTORY ---
+# The Budget_App_Users sheet (Username, Password, Sheet_Name) read once into a
+# dict, so a login is a lookup instead of a full-sheet read. The index is
+# refreshed every USERS_TTL seconds (the admin edits the sheet by hand) and
+# straight away after we write to it ourselves. Only a hash of each password
+# is kept in memory.
+
+USERS_TTL = 5 * 60
+MISS_REFRESH = 30   # an unknown username re-reads the sheet at most this often
+
+
+def _digest(password):
+    return hashlib.sha256(str(password).encode()).digest()
+
+
+class UserDirectory:
+    def __init__(self, get_ws, ttl=USERS_TTL):
+        """`get_ws()` returns the users worksheet."""
+        self.get_ws = get_ws
+        self.ttl = ttl
+        self.users = {}    # username -> (sheet row, password hash, sheet name)
+        self.cols = {}     # header -> 1-based column
+        self.loaded = 0.0
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        values = self.get_ws().get_all_values()
+        header = [h.strip() for h in values[0]] if values else ["Username", "Password", "Sheet_Name"]
+        cols = {h: c for c, h in enumerate(header, start=1)}
+        u, p, s = cols["Username"] - 1, cols["Password"] - 1, cols["Sheet_Name"] - 1
+        users = {}
+        for r, row in enumerate(values[1:], start=2):
+            row = row + [""] * (len(header) - len(row))
+            # First row wins, like the old DataFrame lookup
+            if row[u] and row[u] not in users:
+                users[row[u]] = (r, _digest(row[p]), row[s])
+        self.users, self.cols, self.loaded = users, cols, time.time()
+
+    def _get(self, username):
+        username = str(username)
+        with self.lock:
+            age = time.time() - self.loaded
+            if age > self.ttl or (username not in self.users and age > MISS_REFRESH):
+                self._refresh()
+            return self.users.get(username)
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded = 0.0
+
+    def check(self, username, password):
+        """Sheet name for a correct username / password, else None."""
+        entry = self._get(username)
+        if entry and hmac.compare_digest(entry[1], _digest(password)):
+            return entry[2]
+        return None
+
+    def register(self, username, password, sheet_name):
+        self.get_ws().append_row([username, password, sheet_name])
+        self.invalidate()
+
+    def change_password(self, username, new_password):
+        entry = self._get(username)
+        if entry is None: raise KeyError(username)
+        ws = self.get_ws()
+        # The admin may have moved rows since the last refresh; check before writing
+        if ws.cell(entry[0], self.cols["Username"]).value != str(username):
+            self.invalidate()
+            entry = self._get(username)
+            if entry is None: raise KeyError(username)
+        ws.update_cell(entry[0], self.cols["Password"], new_password)
+        with self.lock:
+            self.users[str(username)] = (entry[0], _digest(new_password), entry[2])
@@ -0,0 +1,196 @@
+import atexit
+import threading
+import time
+from bisect import insort
+from collections import defaultdict
+
+import gspread
+
+import scheduler
+
+# --- WRITE-BEHIND QUEUE ---
+# Callbacks drop their writes here and return straight away. A background
+# thread drains the queue every FLUSH_INTERVAL seconds (or sooner once
+# MAX_BATCH writes are waiting), turning runs of appends / updates / deletes on
+# the same tab into a single append_rows / batch_update call.
+#
+# Edits and deletes carry the row ID plus the position the app's index expects
+# it at. The ID cells are checked before writing, so rows moved by another
+# session are still found; ops reach Sheets in the order they were queued.
+#
+# Rate limiting and 429 retries happen in scheduler.py; the worker's requests
+# are marked as background, so they wait behind users' interactive reads.
+# Writes that fail with a 5xx / timeout may still have been applied, so each
+# retry starts over from the sheet: deletes and edits re-locate their IDs and
+# appends skip rows whose ID is already there.
+
+FLUSH_INTERVAL = 2.0
+MAX_BATCH = 50
+
+
+def _col_letter(n):
+    return chr(ord('A') + n - 1)
+
+
+def _unshift(positions):
+    """Positions of a run of deletes, each taken after the previous deletes,
+    mapped back to positions in the sheet as it was before the run."""
+    done, out = [], []
+    for p in positions:
+        if p is not None:
+            for d in done:
+                if d <= p: p += 1
+            insort(done, p)
+        out.append(p)
+    return out
+
+
+class WriteQueue:
+    def __init__(self, open_ws, width, on_error=None, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        """`open_ws(sheet_name, tab)` returns the worksheet, creating it if needed.
+        `width(tab)` is the number of columns of that tab.
+        `on_error(sheet_name, tab)` is called when writes are dropped after retries."""
+        self.open_ws = open_ws
+        self.width = width
+        self.on_error = on_error
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.ops = []                       # (sheet_name, tab, kind, args) in submit order
+        self.in_flight = defaultdict(int)   # sheet_name -> ops taken but not finished
+        self.failed = defaultdict(list)     # sheet_name -> error messages
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="sheets-write-queue", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    # --- PUBLIC API ---
+    def append(self, sheet_name, tab, rows):
+        self._submit(sheet_name, tab, "append", (rows,))
+
+    def update(self, sheet_name, tab, row_id, pos, row):
+        self._submit(sheet_name, tab, "update", (row_id, pos, row))
+
+    def delete(self, sheet_name, tab, row_id, pos):
+        self._submit(sheet_name, tab, "delete", (row_id, pos))
+
+    def pending(self, sheet_name):
+        with self.cond:
+            return self.in_flight[sheet_name] + sum(1 for op in self.ops if op[0] == sheet_name)
+
+    def pop_failed(self, sheet_name):
+        with self.cond:
+            return self.failed.pop(sheet_name, [])
+
+    def flush(self, timeout=30.0):
+        """Block until everything queued so far has been written (or timeout)."""
+        deadline = time.time() + timeout
+        with self.cond:
+            self.cond.notify_all()
+            while (self.ops or any(self.in_flight.values())) and time.time() < deadline:
+                self.cond.wait(0.1)
+
+    def _submit(self, sheet_name, tab, kind, args):
+        with self.cond:
+            self.ops.append((sheet_name, tab, kind, args))
+            if len(self.ops) >= self.max_batch: self.cond.notify_all()
+
+    # --- WORKER ---
+    def _run(self):
+        with scheduler.background():
+            self._drain()
+
+    def _drain(self):
+        while True:
+            with self.cond:
+                if len(self.ops) < self.max_batch: self.cond.wait(self.flush_interval)
+                batch, self.ops = self.ops, []
+                for sheet_name, *_ in batch: self.in_flight[sheet_name] += 1
+
+            # Tabs are independent, so group per (sheet, tab) but keep order within each
+            per_tab = defaultdict(list)
+            for sheet_name, tab, kind, args in batch:
+                per_tab[(sheet_name, tab)].append((kind, args))
+
+            for (sheet_name, tab), ops in per_tab.items():
+                try:
+                    self._write_tab(sheet_name, tab, ops)
+                except Exception as e:
+                    dropped = self._drop_pending(sheet_name, tab)
+                    self._report(sheet_name, tab, f"{tab}: {len(ops) + dropped} change(s) not saved ({e})")
+                finally:
+                    with self.cond:
+                        self.in_flight[sheet_name] -= len(ops)
+                        self.cond.notify_all()
+
+    def _drop_pending(self, sheet_name, tab):
+        # Later ops were applied locally on top of the failed ones, so drop them too
+        with self.cond:
+            keep = [op for op in self.ops if op[:2] != (sheet_name, tab)]
+            dropped = len(self.ops) - len(keep)
+            self.ops = keep
+        return dropped
+
+    def _write_tab(self, sheet_name, tab, ops):
+        ws = self.open_ws(sheet_name, tab)
+        # Coalesce consecutive ops of the same kind into one API call
+        i = 0
+        while i < len(ops):
+            kind = ops[i][0]
+            j = i
+            while j < len(ops) and ops[j][0] == kind: j += 1
+            run = [args for _, args in ops[i:j]]
+            for attempt in range(scheduler.MAX_RETRIES):
+                try:
+                    self._write_run(ws, sheet_name, tab, kind, run, retry=attempt > 0)
+                    break
+                except gspread.exceptions.APIError as e:
+                    # 429s were already retried by the scheduler
+                    status = e.response.status_code
+                    if status == 429 or status not in scheduler.RETRY_STATUS or attempt == scheduler.MAX_RETRIES - 1: raise
+                    time.sleep(scheduler.backoff(attempt))
+            i = j
+
+    def _write_run(self, ws, sheet_name, tab, kind, run, retry):
+        last_col = _col_letter(self.width(tab))
+        if kind == "append":
+            rows = [row for (batch,) in run for row in batch]
+            if retry:
+                present = set(ws.col_values(self.width(tab)))
+                rows = [row for row in rows if row[-1] not in present]
+            if rows: ws.append_rows(rows)
+        elif kind == "update":
+            rows = self._locate(ws, tab, [a[0] for a in run], [a[1] for a in run])
+            data = [{"range": f"A{r}:{last_col}{r}", "values": [row]} for r, (_, _, row) in zip(rows, run) if r]
+            if data: ws.batch_update(data)
+            if None in rows: self._report(sheet_name, tab, f"{tab}: {rows.count(None)} edited row(s) no longer in the sheet")
+        else:
+            rows = self._locate(ws, tab, [a[0] for a in run], _unshift([a[1] for a in run]))
+            # Bottom-up, so each delete leaves the rows above it where they were
+            reqs = [{"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS",
+                                                   "startIndex": r - 1, "endIndex": r}}}
+                    for r in sorted({r for r in rows if r}, reverse=True)]
+            if reqs: ws.spreadsheet.batch_update({"requests": reqs})
+
+    def _locate(self, ws, tab, ids, expected):
+        """Sheet rows (1-based) of `ids`, or None for rows that are gone.
+
+        The expected positions come from the app's index; one batch_get of the
+        ID cells confirms them, and only a miss costs a read of the ID column.
+        """
+        id_col = _col_letter(self.width(tab))
+        rows = [None if p is None else p + 2 for p in expected]
+        known = [k for k, r in enumerate(rows) if r]
+        if known:
+            cells = ws.batch_get([f"{id_col}{rows[k]}" for k in known])
+            for k, cell in zip(known, cells):
+                if not (cell and cell[0] and cell[0][0] == ids[k]): rows[k] = None
+        if None in rows:
+            column = ws.col_values(self.width(tab))
+            where = {v: r for r, v in enumerate(column, start=1)}
+            rows = [r or where.get(row_id) for r, row_id in zip(rows, ids)]
+        return rows
+
+    def _report(self, sheet_name, tab, msg):
+        with self.cond:
+            self.failed[sheet_name].append(msg)
+        if self.on_error: self.on_error(sheet_name, tab)